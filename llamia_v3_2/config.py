@@ -31,6 +31,14 @@ class LlamiaConfig:
     # RAG / embeddings (local)
     embed_model: str = "mxbai-embed-large"
     rag_top_k: int = 8
+    embed_batch_size: int = 64  # chunk texts per Ollama embedding request during ingest
+    rag_chunk_size: int = 1024
+    rag_chunk_overlap: int = 128
+    rag_ingest_workers: int = 1  # >1 runs the ingest pipeline in a process pool
+    rag_read_workers: int = 4  # threads reading file shards ahead of the embedder
+
+    # Planner template cache: reuse a stored plan when goal embeddings are this similar
+    plan_template_similarity: float = 0.92
     embed_api_base: str = "http://127.0.0.1:11434"  # Ollama base (NOT /v1)
 
     # Web search
@@ -41,6 +49,9 @@ class LlamiaConfig:
 
     max_loops: int = 3
 
+    # Debug trace (state.log / graph trace lines). Disable to skip all trace formatting.
+    trace_enabled: bool = True
+
     # Global defaults (used only if a role doesn't override)
     api_base: str | None = "http://127.0.0.1:11434/v1"
     api_key_env: str = "OPENAI_API_KEY"
@@ -3,9 +3,18 @@ from __future__ import annotations
 import json
 from typing import Any, Callable
 
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
-from .state import LlamiaGraphState
+try:  # optional: node-level caching needs a newer langgraph than the minimum we support
+    from langgraph.cache.memory import InMemoryCache
+    from langgraph.types import CachePolicy
+except Exception:  # pragma: no cover - older langgraph
+    InMemoryCache = None
+    CachePolicy = None
+
+from .config import DEFAULT_CONFIG
+from .state import InvocationCancelled, LlamiaGraphState
 from .nodes.intent_classifier import intent_classifier_node
 from .nodes.intent_router import intent_router_node
 from .nodes.chat import chat_node
@@ -102,7 +111,15 @@ def _trace(state: Any, event: dict[str, Any]) -> None:
 def _wrap_step(
     name: str, fn: Callable[[LlamiaGraphState], LlamiaGraphState]
 ) -> Callable[[LlamiaGraphState], LlamiaGraphState]:
-    def _step(state: LlamiaGraphState) -> LlamiaGraphState:
+    def _step(state: LlamiaGraphState, config: RunnableConfig) -> LlamiaGraphState:
+        token = (config.get("configurable") or {}).get("cancel_token")
+        if token is not None and token.cancelled:
+            raise InvocationCancelled(f"invocation cancelled before node {name!r}")
+
+        # Snapshots only feed the trace; skip them entirely when tracing is off.
+        if not DEFAULT_CONFIG.trace_enabled:
+            return fn(state)
+
         before = _snapshot(state)
         _trace(state, {"event": "node_enter", "node": name, "snap": before})
 
@@ -124,6 +141,8 @@ def _wrap_step(
 def _wrap_router(name: str, router_fn: Callable[[Any], str]) -> Callable[[Any], str]:
     def _r(state: Any) -> str:
         choice = router_fn(state)
+        if not DEFAULT_CONFIG.trace_enabled:
+            return choice
         _trace(state, {"event": "route", "node": name, "choice": choice, "snap": _snapshot(state)})
         return choice
 
@@ -224,12 +243,25 @@ def _route_from_critic(state: Any) -> str:
     return "chat"
 
 
-def build_llamia_graph():
+def build_llamia_graph(node_cache: bool = False, cache_ttl: int | None = None):
+    """
+    Build and compile the graph.
+
+    With `node_cache=True` (and a langgraph that ships CachePolicy), the pure
+    routing nodes are memoized in an in-memory cache for `cache_ttl` seconds.
+    """
     workflow = StateGraph(LlamiaGraphState)
+    use_cache = node_cache and CachePolicy is not None
+    cache_kwargs: dict[str, Any] = {"cache_policy": CachePolicy(ttl=cache_ttl)} if use_cache else {}
 
     # Wrap nodes (enter/exit)
-    workflow.add_node("intent_classifier", _wrap_step("intent_classifier", intent_classifier_node))
-    workflow.add_node("intent_router", _wrap_step("intent_router", intent_router_node))
+    # The routing nodes depend only on their input state (no LLM, disk or network).
+    # Nodes return the whole state, so cache entries must use LangGraph's default key
+    # over the full input: a hit replays the entire state the node returned, which is
+    # only correct for that exact same input. A narrower key_func would replay stale
+    # messages/trace over newer ones.
+    for name, fn in (("intent_classifier", intent_classifier_node), ("intent_router", intent_router_node)):
+        workflow.add_node(name, _wrap_step(name, fn), **cache_kwargs)
     workflow.add_node("research", _wrap_step("research", research_node))
     workflow.add_node("research_web", _wrap_step("research_web", research_web_node))
     workflow.add_node("planner", _wrap_step("planner", planner_node))
@@ -287,4 +319,6 @@ def build_llamia_graph():
     )
 
     workflow.add_edge("chat", END)
+    if use_cache:
+        return workflow.compile(cache=InMemoryCache())
     return workflow.compile()
@@ -17,7 +17,7 @@ Core Components:
 
 import os
 import logging
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from openai import OpenAI, APIError, APITimeoutError
 
@@ -125,3 +125,53 @@ def chat_completion(
     except Exception as e:
         logger.error(f"Unexpected error in chat_completion: {e}")
         return f"Error: Unexpected issue when calling LLM. Details: {str(e)}"
+
+
+def chat_completion_stream(
+    messages: Iterable[Message],
+    model_cfg: ModelConfig | None = None,
+) -> Iterator[str]:
+    """
+    Streaming variant of chat_completion: yields content deltas as they arrive.
+    Closing the generator early (e.g. `break` in the caller) closes the HTTP stream,
+    so callers can stop generation once they have what they need.
+    Errors are yielded as a single text chunk, matching chat_completion's contract.
+    """
+    cfg = model_cfg or DEFAULT_CONFIG.chat_model
+    client = get_client(cfg)
+
+    api_messages = [{"role": m["role"], "content": m["content"]} for m in messages]
+
+    try:
+        stream = client.chat.completions.create(
+            model=cfg.model,
+            messages=api_messages,
+            temperature=cfg.temperature,
+            max_tokens=cfg.max_output_tokens,
+            stream=True,
+        )
+    except APITimeoutError as e:
+        logger.error(f"API timeout error: {e}")
+        yield "Error: Request to LLM timed out. Please try again."
+        return
+    except APIError as e:
+        logger.error(f"API error: {e}")
+        yield f"Error: Failed to get response from LLM. Details: {str(e)}"
+        return
+    except Exception as e:
+        logger.error(f"Unexpected error in chat_completion_stream: {e}")
+        yield f"Error: Unexpected issue when calling LLM. Details: {str(e)}"
+        return
+
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    except (APITimeoutError, APIError) as e:
+        # Keep whatever already streamed; the caller's parser decides if it is usable.
+        logger.error(f"API error while streaming: {e}")
+    finally:
+        stream.close()
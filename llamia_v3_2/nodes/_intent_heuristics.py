@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+"""
+Shared intent heuristics.
+
+Single home for the routing heuristics used by intent_classifier and chat:
+- REPL prefix stripping ('you> ...')
+- explicit prefix detection (web:/search:, research:/reindex:, task:)
+- the keyword heuristic that recognizes implicit coding tasks
+
+Keyword tables are module-level constants so they are built once at import.
+
+The module only imports the stdlib and is fully annotated, so it can be
+compiled ahead of time with mypyc for a native hot path:
+
+    mypyc llamia_v3_2/nodes/_intent_heuristics.py
+
+The compiled extension shadows this file on import; without it the pure-Python
+source is used unchanged.
+"""
+
+import re
+from typing import Any, Final
+
+# Prefix groups checked with a single tuple-form str.startswith call.
+WEB_PREFIXES: Final = ("web:", "search:")
+TASK_PREFIXES: Final = ("task:", "task ")
+
+# One anchored pass over the (lowercased) message decides which explicit prefix, if any, is present.
+_PREFIX_RE: Final = re.compile(r"(?P<web>web:|search:)|(?P<research>research:|reindex:)|(?P<task>task[: ])")
+
+GREETINGS: Final[frozenset[str]] = frozenset({"hi", "hey", "hello", "yo", "sup"})
+
+VERB_KEYWORDS: Final[tuple[str, ...]] = (
+    "write a ",
+    "write an ",
+    "write the ",
+    "write some code",
+    "write code",
+    "write a script",
+    "build a ",
+    "build an ",
+    "build the ",
+    "create a ",
+    "create an ",
+    "generate code",
+    "implement ",
+    "make a script",
+    "make a program",
+    "fix this code",
+    "fix the code",
+    "refactor this",
+)
+
+# Matched as whole tokens ("python script" is covered by the separate "python" token check).
+OBJECT_KEYWORDS: Final[frozenset[str]] = frozenset(
+    {
+        "script",
+        "program",
+        "function",
+        "module",
+        "tool",
+        "bot",
+        "cli",
+    }
+)
+
+_TOKEN_RE: Final = re.compile(r"[a-z]+")
+
+
+def _build_keyword_automaton() -> Any:
+    """
+    Build a single Aho-Corasick automaton over the verb keywords so a message is
+    scanned once instead of once per keyword. Returns None if pyahocorasick is
+    not installed (we then fall back to a precompiled regex alternation).
+    """
+    try:
+        import ahocorasick
+    except Exception:
+        return None
+
+    ac = ahocorasick.Automaton()
+    for kw in VERB_KEYWORDS:
+        ac.add_word(kw, kw)
+    ac.make_automaton()
+    return ac
+
+
+_KEYWORD_AC: Final[Any] = _build_keyword_automaton()
+
+# Fallback when pyahocorasick is missing: one precompiled alternation.
+_VERB_RE: Final = re.compile("|".join(re.escape(kw) for kw in VERB_KEYWORDS))
+
+
+def strip_repl_prefix(text: str) -> str:
+    """
+    Users sometimes paste prompts like: 'you> task: ...'
+    Strip any leading 'you>' tokens so routing behaves consistently.
+    """
+    s = (text or "").strip()
+    # Fast path: almost no message starts with 'y', so skip the slice + lower entirely.
+    if s[:1] not in ("y", "Y"):
+        return s
+    # Lowercase only the 4-char window, not the whole (possibly huge) message.
+    while s[:4].lower() == "you>":
+        s = s[4:].lstrip()
+    return s
+
+
+def match_prefix(lower: str) -> str | None:
+    """Return 'web', 'research', 'task' or None for an already-lowercased message."""
+    m = _PREFIX_RE.match(lower)
+    return m.lastgroup if m else None
+
+
+# The helpers below take the message already passed through strip_repl_prefix
+# (`stripped`) and its lowercased form (`lower`), computed once per classify() call.
+
+
+def extract_task_goal(stripped: str, lower: str) -> str:
+    if lower.startswith(TASK_PREFIXES):
+        # Both prefixes are 5 chars long.
+        return stripped[5:].strip() or "(unspecified task goal)"
+    return stripped
+
+
+def extract_web_query(stripped: str, lower: str) -> str:
+    if lower.startswith(WEB_PREFIXES):
+        return stripped.split(":", 1)[1].strip()
+    return stripped
+
+
+def extract_repo_research_query(stripped: str) -> str:
+    # Keep the prefix for research_node to parse reindex:/research:
+    return stripped
+
+
+def looks_like_task(lower: str) -> bool:
+    if lower in GREETINGS:
+        return False
+
+    if _KEYWORD_AC is not None:
+        if next(_KEYWORD_AC.iter(lower), None) is not None:
+            return True
+    elif _VERB_RE.search(lower):
+        return True
+
+    # Object branch: tokenize once and intersect instead of N substring scans.
+    tokens = frozenset(_TOKEN_RE.findall(lower))
+    return "python" in tokens and not OBJECT_KEYWORDS.isdisjoint(tokens)
+
+
+def classify(text: str) -> tuple[str, str, str | None]:
+    """
+    Classify one user message.
+
+    Returns:
+        (intent_kind, intent_source, intent_payload) where intent_kind is one of
+        'research_web', 'research', 'task', 'chat'.
+    """
+    stripped = strip_repl_prefix(text)
+    lower = stripped.lower()
+    prefix = match_prefix(lower)
+
+    if prefix == "web":
+        return "research_web", "explicit_web", extract_web_query(stripped, lower)
+    if prefix == "research":
+        return "research", "explicit_research", extract_repo_research_query(stripped)
+    if prefix == "task":
+        return "task", "explicit_task", extract_task_goal(stripped, lower)
+    if looks_like_task(lower):
+        return "task", "heuristic_task", stripped
+    return "chat", "default_chat", None
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+"""
+Planner response cache.
+
+Process-wide LRU of raw planner LLM responses keyed by a SHA256 over
+(model, temperature, normalized goal, research notes). Re-planning the same
+goal (task retries, repeated prompts) becomes a dict lookup instead of a
+complexity call + chat_completion round-trip.
+
+Only responses that parsed into a non-empty plan are stored, so transient
+LLM errors are never replayed.
+
+A second, semantic tier keeps plan templates keyed by goal embedding, so
+paraphrases of an earlier goal reuse its steps when cosine similarity clears
+DEFAULT_CONFIG.plan_template_similarity. Templates are scoped to the planner
+model/settings that produced them. It needs numpy and the Ollama embedding
+endpoint; if either is unavailable the tier is simply skipped, and a failed
+embed call disables it for EMBED_RETRY_S so misses don't keep paying for it.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+try:  # optional: faster C JSON serializer for cache keys
+    import orjson
+except Exception:  # pragma: no cover - orjson is not a hard dependency
+    orjson = None
+
+try:  # optional: vectorized similarity for the template tier
+    import numpy as np
+except Exception:  # pragma: no cover - numpy comes in via llama-index/chromadb
+    np = None
+
+from ..config import DEFAULT_CONFIG
+
+MAX_ENTRIES = 512
+MAX_TEMPLATES = 2048
+EMBED_TIMEOUT_S = 2.0
+EMBED_RETRY_S = 300.0
+
+_CACHE: OrderedDict[str, str] = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def plan_cache_key(model: str, temperature: float, goal: str, notes: str) -> str:
+    parts = [model, temperature, goal.strip().lower(), notes.strip()]
+    if orjson is not None:
+        # orjson emits UTF-8 bytes directly (same text as ensure_ascii=False), no extra encode pass.
+        return hashlib.sha256(orjson.dumps(parts)).hexdigest()
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def get_cached_plan(key: str) -> str | None:
+    with _LOCK:
+        raw = _CACHE.get(key)
+        if raw is not None:
+            _CACHE.move_to_end(key)
+        return raw
+
+
+def put_cached_plan(key: str, raw: str) -> None:
+    with _LOCK:
+        _CACHE[key] = raw
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+
+
+def clear_plan_cache() -> None:
+    global _TEMPLATE_MATRIX
+    with _LOCK:
+        _CACHE.clear()
+        _TEMPLATE_KEYS.clear()
+        _TEMPLATE_SCOPES.clear()
+        _TEMPLATE_VECS.clear()
+        _TEMPLATES.clear()
+        _TEMPLATE_MATRIX = None
+        _EMBED_STATE["down_until"] = 0.0
+
+
+# -----------------------------
+# Semantic plan-template tier
+# -----------------------------
+_TEMPLATE_KEYS: list[str] = []  # insertion order, oldest first (parallel to _TEMPLATE_VECS rows)
+_TEMPLATE_SCOPES: list[str] = []  # plan_template_scope() of each row
+_TEMPLATES: dict[str, tuple[str, ...]] = {}
+_TEMPLATE_VECS: list = []
+_TEMPLATE_MATRIX = None  # np.stack of _TEMPLATE_VECS, rebuilt lazily after inserts
+_EMBED_STATE = {"down_until": 0.0}  # monotonic time before which embed_goal() won't call out
+
+
+def plan_template_scope(model: str, temperature: float) -> str:
+    """Fingerprint of the settings a template was planned under; lookups only match the same scope."""
+    return f"{model}|{temperature}|{DEFAULT_CONFIG.embed_model}"
+
+
+def embed_goal(goal: str):
+    """
+    Unit-normalized embedding of the goal via Ollama, or None if unavailable.
+
+    A failure (unreachable endpoint, timeout, empty embedding) is remembered
+    for EMBED_RETRY_S, during which this returns None without a request.
+    """
+    if np is None or time.monotonic() < _EMBED_STATE["down_until"]:
+        return None
+    try:
+        import httpx
+
+        r = httpx.post(
+            DEFAULT_CONFIG.embed_api_base.rstrip("/") + "/api/embeddings",
+            json={"model": DEFAULT_CONFIG.embed_model, "prompt": goal.strip()},
+            timeout=EMBED_TIMEOUT_S,
+        )
+        r.raise_for_status()
+        vec = np.asarray(r.json().get("embedding") or [], dtype=np.float32)
+    except Exception:
+        vec = None
+    norm = float(np.linalg.norm(vec)) if vec is not None and vec.size else 0.0
+    if not norm:
+        _EMBED_STATE["down_until"] = time.monotonic() + EMBED_RETRY_S
+        return None
+    return vec / norm
+
+
+def find_plan_template(vec, scope: str) -> tuple[str, ...] | None:
+    """Return step descriptions of the most similar stored goal in `scope`, if similar enough."""
+    global _TEMPLATE_MATRIX
+    if vec is None:
+        return None
+    with _LOCK:
+        if scope not in _TEMPLATE_SCOPES:
+            return None
+        if _TEMPLATE_MATRIX is None:
+            _TEMPLATE_MATRIX = np.stack(_TEMPLATE_VECS)
+        if _TEMPLATE_MATRIX.shape[1] != vec.shape[0]:
+            return None  # embed model changed; stored vectors are not comparable
+        sims = _TEMPLATE_MATRIX @ vec
+        sims[np.asarray(_TEMPLATE_SCOPES) != scope] = -np.inf
+        best = int(sims.argmax())
+        if float(sims[best]) < DEFAULT_CONFIG.plan_template_similarity:
+            return None
+        key = _TEMPLATE_KEYS[best]
+        return _TEMPLATES[key]
+
+
+def store_plan_template(vec, key: str, scope: str, descriptions: list[str]) -> None:
+    global _TEMPLATE_MATRIX
+    if vec is None or not descriptions:
+        return
+    with _LOCK:
+        if key in _TEMPLATES:
+            i = _TEMPLATE_KEYS.index(key)
+            del _TEMPLATE_KEYS[i]
+            del _TEMPLATE_SCOPES[i]
+            del _TEMPLATE_VECS[i]
+        _TEMPLATE_KEYS.append(key)
+        _TEMPLATE_SCOPES.append(scope)
+        _TEMPLATE_VECS.append(vec)
+        _TEMPLATES[key] = tuple(descriptions)
+        while len(_TEMPLATE_KEYS) > MAX_TEMPLATES:
+            old = _TEMPLATE_KEYS.pop(0)
+            _TEMPLATE_SCOPES.pop(0)
+            _TEMPLATE_VECS.pop(0)
+            _TEMPLATES.pop(old, None)
+        _TEMPLATE_MATRIX = None
@@ -3,6 +3,7 @@ from __future__ import annotations
 from ..state import LlamiaState
 from ..config import DEFAULT_CONFIG
 from ..llm_client import chat_completion
+from ._intent_heuristics import match_prefix, strip_repl_prefix
 
 NODE_NAME = "chat"
 
@@ -15,28 +16,16 @@ def _tail(s: str, n: int) -> str:
     return s if len(s) <= n else s[-n:]
 
 
-def _strip_repl_prefix(text: str) -> str:
-    s = (text or "").strip()
-    while s.lower().startswith("you>"):
-        s = s[4:].lstrip()
-    return s
-
-
 def _latest_user_text(state: LlamiaState) -> str:
-    for m in reversed(state.messages):
-        if m.get("role") == "user":
-            return _strip_repl_prefix(m.get("content") or "").strip()
-    return ""
+    return strip_repl_prefix(state.latest_user_text())
 
 
 def _looks_like_web_query(text: str) -> bool:
-    t = _strip_repl_prefix(text).strip().lower()
-    return t.startswith("web:") or t.startswith("search:")
+    return match_prefix(strip_repl_prefix(text).lower()) == "web"
 
 
 def _looks_like_repo_research_query(text: str) -> bool:
-    t = _strip_repl_prefix(text).strip().lower()
-    return t.startswith("research:") or t.startswith("reindex:")
+    return match_prefix(strip_repl_prefix(text).lower()) == "research"
 
 
 def _last_user_index(state: LlamiaState) -> int:
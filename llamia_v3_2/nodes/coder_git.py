@@ -6,10 +6,25 @@ Git helpers for the coder node.
 In patch-proposal mode we need to:
 - list git-tracked files (to prevent hallucinated diff targets)
 - keep the prompt small (filtered list)
+
+When pygit2 is available we read the index in-process through a single cached
+repository handle; otherwise we fall back to spawning `git ls-files`.
 """
 
 from pathlib import Path
-from typing import List
+from typing import Any, List
+
+try:  # optional: in-process index access (no fork/exec per call)
+    import pygit2
+except Exception:  # pragma: no cover - pygit2 is not a hard dependency
+    pygit2 = None
+
+
+_SKIP_PREFIXES = ("workspace/", ".llamia_chroma/", ".venv/")
+_SKIP_EXTS = (".bin", ".sqlite3", ".db")
+
+# Cached pygit2.Repository (opened once, reopened only if it went missing).
+_REPO: Any = None
 
 
 def repo_root() -> Path:
@@ -19,42 +34,58 @@ def repo_root() -> Path:
     return Path(__file__).resolve().parents[2]
 
 
-def git_ls_files_all() -> list[str]:
+def _open_repo() -> Any:
     """
-    Return ALL git-tracked file paths (repo-relative).
-
-    Safe failure: returns [] if git is missing or repo isn't a git checkout.
+    Return the cached pygit2 repository handle, or None if pygit2 is unavailable
+    or the repo root is not a git checkout.
     """
+    global _REPO
+    if pygit2 is None:
+        return None
+    if _REPO is not None and Path(_REPO.path).exists():
+        return _REPO
     try:
-        import subprocess
-
-        out = subprocess.check_output(["git", "ls-files"], text=True, cwd=str(repo_root()))
+        _REPO = pygit2.Repository(str(repo_root()))
     except Exception:
-        return []
-    return [ln.strip() for ln in out.splitlines() if ln.strip()]
+        _REPO = None
+    return _REPO
 
 
-def git_ls_files_filtered(*, limit: int = 200) -> list[str]:
-    """
-    Return a filtered subset of git-tracked file paths to keep prompts small.
-    """
+def _ls_files() -> list[str]:
+    repo = _open_repo()
+    if repo is not None:
+        try:
+            index = repo.index
+            index.read(False)  # pick up changes made since the handle was opened
+            return [e.path for e in index]
+        except Exception:
+            pass
+
     try:
         import subprocess
 
         out = subprocess.check_output(["git", "ls-files"], text=True, cwd=str(repo_root()))
     except Exception:
         return []
+    return [ln.strip() for ln in out.splitlines() if ln.strip()]
+
+
+def git_ls_files_all() -> list[str]:
+    """
+    Return ALL git-tracked file paths (repo-relative).
 
-    files = [ln.strip() for ln in out.splitlines() if ln.strip()]
+    Safe failure: returns [] if git is missing or repo isn't a git checkout.
+    """
+    return _ls_files()
 
-    skip_prefixes = ("workspace/", ".llamia_chroma/", ".venv/")
-    skip_exts = (".bin", ".sqlite3", ".db")
 
+def git_ls_files_filtered(*, limit: int = 200) -> list[str]:
+    """
+    Return a filtered subset of git-tracked file paths to keep prompts small.
+    """
     filtered: List[str] = []
-    for f in files:
-        if any(f.startswith(p) for p in skip_prefixes):
-            continue
-        if any(f.endswith(ext) for ext in skip_exts):
+    for f in _ls_files():
+        if f.startswith(_SKIP_PREFIXES) or f.endswith(_SKIP_EXTS):
             continue
         filtered.append(f)
         if len(filtered) >= limit:
@@ -12,22 +12,28 @@ This module:
 - builds a system prompt block the model can rely on for correct hunks
 """
 
+import mmap
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Any, List
 
 from .coder_git import repo_root
 
 
+_PATCH_TASK_MARKERS = ("unified diff", "diff --git", "git style", ".patch", "improvements.patch")
+
+
 def is_patch_task(goal: str) -> bool:
     """
     Heuristic: treat the goal as "patch proposal mode" if it asks for a unified diff / .patch.
     """
     g = (goal or "").lower()
-    return any(k in g for k in ["unified diff", "diff --git", "git style", ".patch", "improvements.patch"])
+    return any(k in g for k in _PATCH_TASK_MARKERS)
 
 
-_FILE_IN_GOAL_RE = re.compile(r"(?P<path>[A-Za-z0-9_./\\-]+\\.(?:py|md|toml|yaml|yml|txt))")
+_FILE_IN_GOAL_RE = re.compile(r"(?P<path>[A-Za-z0-9_./\\-]+\.(?:py|md|toml|yaml|yml|txt))")
 
 
 def extract_paths_from_goal(goal: str, tracked: set[str]) -> list[str]:
@@ -37,13 +43,105 @@ def extract_paths_from_goal(goal: str, tracked: set[str]) -> list[str]:
     This prevents "diff --git a/fake.py b/fake.py" patches.
     """
     hits: list[str] = []
+    seen: set[str] = set()
     for m in _FILE_IN_GOAL_RE.finditer(goal or ""):
-        p = m.group("path").strip().replace("\\\\", "/")
-        if p in tracked and p not in hits:
+        p = m.group("path").strip().replace("\\", "/")
+        if p in tracked and p not in seen:
+            seen.add(p)
             hits.append(p)
     return hits
 
 
+# Files at least this large are scanned through mmap so we only decode the kept window.
+_MMAP_MIN_BYTES = 64 * 1024
+
+
+def _compile_anchors(anchor_patterns: list[str] | None) -> list[re.Pattern[str]]:
+    regs: list[re.Pattern[str]] = []
+    for pat in anchor_patterns or []:
+        try:
+            regs.append(re.compile(pat))
+        except re.error:
+            continue
+    return regs
+
+
+def _window_from_text(
+    p: Path,
+    regs: list[re.Pattern[str]],
+    *,
+    window_before: int,
+    window_after: int,
+    fallback_max_lines: int,
+) -> tuple[int, list[str]]:
+    text = p.read_text(encoding="utf-8", errors="replace").replace("\\r\\n", "\\n")
+    lines = text.splitlines()
+
+    start = 0
+    end = min(len(lines), fallback_max_lines)
+
+    if regs:
+        hit_idx: int | None = None
+        for i, ln in enumerate(lines):
+            if any(r.search(ln) for r in regs):
+                hit_idx = i
+                break
+
+        if hit_idx is not None:
+            start = max(0, hit_idx - window_before)
+            end = min(len(lines), hit_idx + window_after)
+
+    return start, lines[start:end]
+
+
+def _window_from_mmap(
+    p: Path,
+    regs: list[re.Pattern[str]],
+    *,
+    window_before: int,
+    window_after: int,
+    fallback_max_lines: int,
+) -> tuple[int, list[str]]:
+    """
+    Same result as _window_from_text, but walks the file with mm.readline() and stops
+    as soon as the window is complete instead of materializing the whole file as str.
+    """
+    def _decode(raw: bytes) -> str:
+        return raw.decode("utf-8", "replace").rstrip("\r\n")
+
+    with open(p, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        head: list[str] = []
+        if not regs:
+            while len(head) < fallback_max_lines:
+                raw = mm.readline()
+                if not raw:
+                    break
+                head.append(_decode(raw))
+            return 0, head
+
+        before: deque[str] = deque(maxlen=max(0, window_before))
+        i = 0
+        for raw in iter(mm.readline, b""):
+            ln = _decode(raw)
+            if any(r.search(ln) for r in regs):
+                chunk = list(before)
+                start = i - len(chunk)
+                chunk.append(ln)
+                end = i + window_after  # exclusive, as in _window_from_text
+                while len(chunk) < end - start:
+                    raw = mm.readline()
+                    if not raw:
+                        break
+                    chunk.append(_decode(raw))
+                del chunk[max(0, end - start):]
+                return start, chunk
+            before.append(ln)
+            if len(head) < fallback_max_lines:
+                head.append(ln)
+            i += 1
+        return 0, head
+
+
 def read_numbered_window(
     relpath: str,
     *,
@@ -58,39 +156,26 @@ def read_numbered_window(
       - If anchor_patterns match a line, return a window around the first match.
       - Else return the first fallback_max_lines lines.
 
+    Large files are memory-mapped and only the kept lines are decoded.
+
     Always line-number the excerpt so the model can verify what it's seeing.
     IMPORTANT: instruct the model to NOT include line numbers in diff context.
     """
     p = (repo_root() / relpath).resolve()
+    regs = _compile_anchors(anchor_patterns)
+    window = {
+        "window_before": window_before,
+        "window_after": window_after,
+        "fallback_max_lines": fallback_max_lines,
+    }
     try:
-        text = p.read_text(encoding="utf-8", errors="replace").replace("\\r\\n", "\\n")
+        if p.stat().st_size >= _MMAP_MIN_BYTES:
+            start, chunk = _window_from_mmap(p, regs, **window)
+        else:
+            start, chunk = _window_from_text(p, regs, **window)
     except Exception as e:
         return f"[could not read {relpath}: {e!r}]"
 
-    lines = text.splitlines()
-
-    start = 0
-    end = min(len(lines), fallback_max_lines)
-
-    if anchor_patterns:
-        regs = []
-        for pat in anchor_patterns:
-            try:
-                regs.append(re.compile(pat))
-            except re.error:
-                continue
-
-        hit_idx: int | None = None
-        for i, ln in enumerate(lines):
-            if any(r.search(ln) for r in regs):
-                hit_idx = i
-                break
-
-        if hit_idx is not None:
-            start = max(0, hit_idx - window_before)
-            end = min(len(lines), hit_idx + window_after)
-
-    chunk = lines[start:end]
     numbered = "\\n".join(f"{start + i + 1:04d} {ln}" for i, ln in enumerate(chunk))
     if len(numbered) > max_chars:
         numbered = numbered[:max_chars] + "\\n...[truncated]"
@@ -120,26 +205,32 @@ def build_patch_context(goal: str, tracked_files: list[str]) -> str:
     if not targets:
         return ""
 
-    out: List[str] = []
-    out.append("[patch_context] Authoritative repo excerpts (use for exact diff hunks).\\n")
-    out.append("Do NOT invent code. Patch must match these files exactly.\\n")
-    out.append("Line numbers are for reference only; do NOT include them in diff context.\\n")
-
+    # Excerpt reads are independent disk I/O; overlap them, then assemble in target order.
+    specs: list[tuple[str, dict[str, Any]]] = []
     for t in targets[:4]:
-        out.append(f"\\n--- FILE: {t} (numbered excerpt) ---\\n")
         if t.endswith("repl/app.py"):
-            excerpt = read_numbered_window(
-                t,
-                anchor_patterns=[
+            kwargs: dict[str, Any] = {
+                "anchor_patterns": [
                     r"def\\s+run_repl\\b",
                     r"read_user_input_block",
                     r"STRICT|contract|validate",
                 ],
-                fallback_max_lines=240,
-            )
+                "fallback_max_lines": 240,
+            }
         else:
-            excerpt = read_numbered_window(t, anchor_patterns=None, fallback_max_lines=200)
+            kwargs = {"anchor_patterns": None, "fallback_max_lines": 200}
+        specs.append((t, kwargs))
 
+    with ThreadPoolExecutor(max_workers=len(specs)) as ex:
+        excerpts = list(ex.map(lambda tk: read_numbered_window(tk[0], **tk[1]), specs))
+
+    out: List[str] = []
+    out.append("[patch_context] Authoritative repo excerpts (use for exact diff hunks).\\n")
+    out.append("Do NOT invent code. Patch must match these files exactly.\\n")
+    out.append("Line numbers are for reference only; do NOT include them in diff context.\\n")
+
+    for (t, _), excerpt in zip(specs, excerpts):
+        out.append(f"\\n--- FILE: {t} (numbered excerpt) ---\\n")
         out.append(excerpt)
         out.append("\\n")
 
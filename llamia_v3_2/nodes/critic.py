@@ -26,42 +26,52 @@ from ..config import DEFAULT_CONFIG
 NODE_NAME = "critic"
 
 
-def _latest_user_text(state: LlamiaState) -> str:
-    for m in reversed(state.messages):
-        if m.get("role") == "user":
-            return (m.get("content") or "").strip()
-    return ""
+# Keyword tables are module-level tuples so they are built once, not on every critic call.
+_FIX_MARKERS = (
+    "then fix",
+    "fix it",
+    "fix the",
+    "until it succeeds",
+    "rerun until",
+    "and fix",
+    "repair",
+)
+
+_EXPECTED_FAILURE_MARKERS = (
+    "should fail",
+    "expected to fail",
+    "intentionally fail",
+    "doesn't exist",
+    "does not exist",
+    "non-existent",
+    "nonexistent",
+    "module not found",
+    "modulenotfounderror",
+    "demonstrate error",
+    "trigger an error",
+)
+
+_LOOKUP_MARKERS = (
+    "look up",
+    "lookup",
+    "search the web",
+    "web search",
+    "find documentation",
+    "docs for",
+    "how do i",
+    "what is the correct",
+)
+
+_MISSING_MODULE_RE = re.compile(r"No module named ['\"]([^'\"]+)['\"]")
 
 
 def _detect_expected_failure(text: str) -> bool:
     t = text.lower()
 
-    fix_markers = [
-        "then fix",
-        "fix it",
-        "fix the",
-        "until it succeeds",
-        "rerun until",
-        "and fix",
-        "repair",
-    ]
-    if any(k in t for k in fix_markers):
+    if any(k in t for k in _FIX_MARKERS):
         return False
 
-    expected_markers = [
-        "should fail",
-        "expected to fail",
-        "intentionally fail",
-        "doesn't exist",
-        "does not exist",
-        "non-existent",
-        "nonexistent",
-        "module not found",
-        "modulenotfounderror",
-        "demonstrate error",
-        "trigger an error",
-    ]
-    return any(k in t for k in expected_markers)
+    return any(k in t for k in _EXPECTED_FAILURE_MARKERS)
 
 
 def _last_run_results(state: LlamiaState) -> list[ExecResult]:
@@ -72,19 +82,20 @@ def _last_run_results(state: LlamiaState) -> list[ExecResult]:
 
 def _extract_missing_module(stderr: str) -> str | None:
     # Example: ModuleNotFoundError: No module named 'foo'
-    m = re.search(r"No module named ['\"]([^'\"]+)['\"]", stderr)
+    m = _MISSING_MODULE_RE.search(stderr)
     return m.group(1) if m else None
 
 
-def _looks_like_needs_web(goal_text: str, stderr: str) -> bool:
-    g = goal_text.lower()
+def _looks_like_needs_web(goal_low: str, stderr_low: str) -> bool:
+    """Both arguments must already be lowercased (critic_node lowercases them once)."""
+    g = goal_low
 
     # user explicitly wants lookup/research
-    if any(k in g for k in ["look up", "lookup", "search the web", "web search", "find documentation", "docs for", "how do i", "what is the correct"]):
+    if any(k in g for k in _LOOKUP_MARKERS):
         return True
 
     # failure types where web help is often useful
-    s = stderr.lower()
+    s = stderr_low
     if "modulenotfounderror" in s or "no module named" in s:
         return True
     if "command not found" in s:
@@ -146,7 +157,7 @@ def critic_node(state: LlamiaState) -> LlamiaState:
         state.log(f"[{NODE_NAME}] done (loop limit)")
         return state
 
-    user_text = _latest_user_text(state)
+    user_text = state.latest_user_text()
     goal_text = (state.goal or "") + "\n" + user_text
     state.expected_failure = _detect_expected_failure(goal_text)
 
@@ -168,13 +179,13 @@ def critic_node(state: LlamiaState) -> LlamiaState:
 
     if failed:
         # Decide whether to web-search before fixing
+        # executor_node already capped stderr to its tail; no need to reslice here.
         stderr = (last.stderr or "").strip()
-        tail = stderr[-2000:] if stderr else "(no stderr)"
+        tail = stderr or "(no stderr)"
 
-        needs_web = (
-            DEFAULT_CONFIG.web_search_provider == "searxng"
-            and _looks_like_needs_web(goal_text, stderr)
-        )
+        # Only pay for lowercasing when web search is actually enabled.
+        web_enabled = DEFAULT_CONFIG.web_search_provider == "searxng"
+        needs_web = web_enabled and _looks_like_needs_web(goal_text.lower(), stderr.lower())
 
         # Avoid spamming web searches
         web_count = int(getattr(state, "web_search_count", 0) or 0)
@@ -28,6 +28,11 @@ def executor_node(state: LlamiaState) -> LlamiaState:
 
     results = run_exec_request(req)
 
+    # Cap output once at ingestion; downstream consumers (critic, chat, logs) reuse it.
+    for r in results:
+        r.stdout = _tail(r.stdout, MAX_STD_TAIL)
+        r.stderr = _tail(r.stderr, MAX_ERR_TAIL)
+
     state.last_exec_results = results
     state.exec_results.extend(results)
 
@@ -39,8 +44,8 @@ def executor_node(state: LlamiaState) -> LlamiaState:
         status = "OK" if r.returncode == 0 else f"FAILED ({r.returncode})"
         lines.append(f"- {r.command} -> {status}")
 
-        out_tail = _tail((r.stdout or "").strip(), MAX_STD_TAIL).strip()
-        err_tail = _tail((r.stderr or "").strip(), MAX_ERR_TAIL).strip()
+        out_tail = (r.stdout or "").strip()
+        err_tail = (r.stderr or "").strip()
 
         if out_tail:
             lines.append("  stdout (tail):")
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import re
 from typing import List
 
 from ..state import LlamiaState, ExecResult
@@ -27,7 +26,7 @@ def handle_transient_failure(state: LlamiaState, results: List[ExecResult]) -> L
     state.log("[failure_handler] Handling transient failure with retry")
     state.add_message("system", "Retrying failed command with exponential backoff...", node="failure_handler")
 
-    state.retry_count = getattr(state, "retry_count", 0) + 1
+    state.retry_count += 1
     if state.retry_count > 3:
         state.add_message("system", "Max retry attempts reached. Moving to next step.", node="failure_handler")
         state.retry_count = 0
@@ -113,7 +112,7 @@ def handle_bad_command(state: LlamiaState, results: List[ExecResult]) -> LlamiaS
         if r.returncode != 0:
             old = (r.command or "")
             new = old.replace("python ", "python3 ")
-            new = re.sub(r"\s+", " ", new).strip()
+            new = " ".join(new.split())  # collapse whitespace runs + strip, no regex
             repaired.append((old, new))
             state.log(f"[failure_handler] Attempting repair: {old} -> {new}")
 
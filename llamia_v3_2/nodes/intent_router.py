@@ -3,49 +3,67 @@ from __future__ import annotations
 import time
 from typing import Any
 
+from ..config import DEFAULT_CONFIG
 from ..state import LlamiaState
 
 NODE_NAME = "intent_router"
 
 
+def _reset_route_fields(
+    state: LlamiaState,
+    *,
+    mode: str,
+    next_agent: str,
+    goal: str | None = None,
+    research_query: str | None = None,
+    return_after: str = "chat",
+    reset_loop: bool = True,
+) -> None:
+    """
+    Apply the per-route field resets shared by every intent_router branch.
+    """
+    state.mode = mode
+    state.goal = goal
+    state.research_query = research_query
+    state.research_notes = None
+    state.web_results = None
+    state.web_queue = []
+    state.web_search_count = 0
+    state.return_after_web = return_after
+    state.return_after_research = return_after
+    if reset_loop:
+        state.loop_count = 0
+    state.fix_instructions = None
+    state.next_agent = next_agent
+
+
 def intent_router_node(state: LlamiaState) -> LlamiaState:
     state.log(f"[{NODE_NAME}] starting")
 
-    # Always ensure trace is a list
-    try:
-        state.trace = list(getattr(state, "trace", []) or [])
-    except Exception:
-        state.trace = []
+    # One clock read per routing invocation, shared by every trace event it emits.
+    ts = time.time()
+    turn_id = getattr(state, "turn_id", None)
 
     def _trace(event: str, **kw: Any) -> None:
+        if not DEFAULT_CONFIG.trace_enabled:
+            return
         # Keep trace as structured dicts (graph.py wraps a separate string trace line too)
         state.trace.append(
             {
                 "node": NODE_NAME,
                 "event": event,
-                "turn_id": getattr(state, "turn_id", None),
-                "ts": time.time(),
+                "turn_id": turn_id,
+                "ts": ts,
                 **kw,
             }
         )
 
     # If no messages, start in chat
     if not getattr(state, "messages", None):
-        state.mode = "chat"
-        state.goal = None
         state.intent_kind = "chat"
         state.intent_payload = None
         state.intent_source = "empty"
-        state.research_query = None
-        state.research_notes = None
-        state.web_results = None
-        state.web_queue = []
-        state.web_search_count = 0
-        state.return_after_web = "chat"
-        state.return_after_research = "chat"
-        state.loop_count = 0
-        state.fix_instructions = None
-        state.next_agent = "chat"
+        _reset_route_fields(state, mode="chat", next_agent="chat")
         state.log(f"[{NODE_NAME}] no messages -> chat")
         _trace("route", kind="chat", next_agent="chat")
         return state
@@ -60,7 +78,7 @@ def intent_router_node(state: LlamiaState) -> LlamiaState:
             if state.next_agent not in {"planner", "coder", "research", "research_web", "chat"}:
                 # Default for repair is coder (it must regenerate artifacts)
                 state.next_agent = "coder"
-            state.log(f"[{NODE_NAME}] TASK(retry): next_agent={state.next_agent}")
+            state.log("[%s] TASK(retry): next_agent=%s", NODE_NAME, state.next_agent)
             _trace("route", kind="task_retry", next_agent=state.next_agent)
             return state
 
@@ -77,18 +95,8 @@ def intent_router_node(state: LlamiaState) -> LlamiaState:
         q = str(payload or "").strip()
         if not q:
             q = str(last.get("content", "") or "").strip()
-        state.mode = "chat"
-        state.goal = None
-        state.research_query = q
-        state.research_notes = None
-        state.web_results = None
-        state.web_queue = []
-        state.web_search_count = 0
-        state.return_after_web = "chat"
-        state.return_after_research = "chat"
-        state.fix_instructions = None
-        state.next_agent = "research_web"
-        state.log(f"[{NODE_NAME}] WEB: next_agent=research_web query={q!r}")
+        _reset_route_fields(state, mode="chat", next_agent="research_web", research_query=q, reset_loop=False)
+        state.log("[%s] WEB: next_agent=research_web query=%r", NODE_NAME, q)
         _trace("route", kind="web", query=q, next_agent="research_web")
         return state
 
@@ -97,55 +105,23 @@ def intent_router_node(state: LlamiaState) -> LlamiaState:
         q = str(payload or "").strip()
         if not q:
             q = str(last.get("content", "") or "").strip()
-        state.mode = "chat"
-        state.goal = None
-        state.research_query = q
-        state.research_notes = None
-        state.web_results = None
-        state.web_queue = []
-        state.web_search_count = 0
-        state.return_after_web = "chat"
-        state.return_after_research = "chat"
-        state.loop_count = 0
-        state.fix_instructions = None
-        state.next_agent = "research"
-        state.log(f"[{NODE_NAME}] RESEARCH: next_agent=research query={q!r}")
+        _reset_route_fields(state, mode="chat", next_agent="research", research_query=q)
+        state.log("[%s] RESEARCH: next_agent=research query=%r", NODE_NAME, q)
         _trace("route", kind="research", query=q, next_agent="research")
         return state
 
-    # Clear any old research query when not doing web/research
-    state.research_query = None
+    # Task/chat branches below also clear any old research query (research_query=None).
 
     # 1) Explicit task
     if intent == "task":
         goal = str(payload or "").strip() or "(unspecified task goal)"
-        state.mode = "task"
-        state.goal = goal
-        state.research_notes = None
-        state.web_results = None
-        state.web_queue = []
-        state.web_search_count = 0
-        state.return_after_web = "planner"
-        state.return_after_research = "planner"
-        state.loop_count = 0
-        state.fix_instructions = None
-        state.next_agent = "planner"
-        state.log(f"[{NODE_NAME}] TASK: mode=task goal={goal!r}")
+        _reset_route_fields(state, mode="task", next_agent="planner", goal=goal, return_after="planner")
+        state.log("[%s] TASK: mode=task goal=%r", NODE_NAME, goal)
         _trace("route", kind="task", goal=goal, next_agent="planner")
         return state
 
     # 3) Default chat
-    state.mode = "chat"
-    state.goal = None
-    state.research_notes = None
-    state.web_results = None
-    state.web_queue = []
-    state.web_search_count = 0
-    state.return_after_web = "chat"
-    state.return_after_research = "chat"
-    state.loop_count = 0
-    state.fix_instructions = None
-    state.next_agent = "chat"
+    _reset_route_fields(state, mode="chat", next_agent="chat")
     state.log(f"[{NODE_NAME}] CHAT: next_agent=chat")
     _trace("route", kind="chat", next_agent="chat")
     return state
@@ -4,9 +4,23 @@ import json
 import re
 from typing import Any
 
+try:  # optional: faster C JSON parser
+    import orjson
+except Exception:  # pragma: no cover - orjson is not a hard dependency
+    orjson = None
+
 from ..config import DEFAULT_CONFIG
-from ..llm_client import chat_completion
+from ..llm_client import chat_completion, chat_completion_stream
 from llamia_v3_2.state import LlamiaState, PlanStep
+from ._plan_cache import (
+    embed_goal,
+    find_plan_template,
+    get_cached_plan,
+    plan_cache_key,
+    plan_template_scope,
+    put_cached_plan,
+    store_plan_template,
+)
 
 """
 Planning Agent (planner)
@@ -51,55 +65,191 @@ STRICT JSON FORMAT:
 }
 """
 
+_COMPLEXITY_HINTS = {
+    "complex": "\nFor complex tasks: break into smaller, manageable phases with verification between phases.",
+    "simple": "\nFor simple tasks: focus on direct, efficient execution steps.",
+    "development": "\nFor development tasks: include testing and verification steps.",
+}
+
+# System messages are identical across calls for a given complexity, so build them once.
+# chat_completion only reads messages; never mutate these in place.
+_SYSTEM_MSGS: dict[str | None, dict[str, str]] = {
+    None: {"role": "system", "content": PLANNER_SYSTEM_PROMPT, "node": NODE_NAME},
+    **{
+        k: {"role": "system", "content": PLANNER_SYSTEM_PROMPT + hint, "node": NODE_NAME}
+        for k, hint in _COMPLEXITY_HINTS.items()
+    },
+}
+
+_WEB_TRIGGERS = (
+    "look up",
+    "lookup",
+    "search for",
+    "search the web",
+    "find documentation",
+    "docs",
+    "documentation",
+    "api",
+    "parameter",
+    "query parameter",
+    "curl",
+    "how do i",
+    "how to",
+    "what is the correct",
+    "latest",
+    "current",
+    "version",
+    "release notes",
+    "searxng",
+    "install",
+    "setup",
+    "configuration",
+    "tutorial",
+    "example",
+    "best practice",
+    "security",
+    "compatibility",
+    "dependency",
+    "library",
+    "framework",
+    "protocol",
+    "standard",
+)
+
+# Local repo-only tasks (patch/diff/test runs) should not trigger web search.
+_LOCAL_ONLY_MARKERS = ("unified diff", "diff --git", ".patch", "git style", "git apply", "git diff")
+
+
+def _build_trigger_automaton():
+    """
+    One Aho-Corasick automaton over both keyword sets, each word tagged with
+    whether it is a web trigger (True) or a local-only marker (False), so a
+    single scan of the goal decides both. Returns None if pyahocorasick is not
+    installed.
+    """
+    try:
+        import ahocorasick
+    except Exception:
+        return None
+
+    ac = ahocorasick.Automaton()
+    for w in _WEB_TRIGGERS:
+        ac.add_word(w, True)
+    for w in _LOCAL_ONLY_MARKERS:
+        ac.add_word(w, False)
+    ac.make_automaton()
+    return ac
+
+
+_TRIGGER_AC = _build_trigger_automaton()
+
+# Fallback without pyahocorasick: each set as one precompiled alternation.
+# (Kept separate: a combined non-overlapping regex scan could hide a marker inside a trigger match.)
+_WEB_TRIGGER_RE = re.compile("|".join(re.escape(t) for t in _WEB_TRIGGERS))
+_LOCAL_ONLY_RE = re.compile("|".join(re.escape(t) for t in _LOCAL_ONLY_MARKERS))
+
+
 def _needs_web_search(goal: str) -> bool:
     """
     Heuristic: tasks that likely require external factual info / docs.
     Keep it conservative to avoid pointless web hits.
     """
-    t = (goal or "").lower().strip()
-
-    # Local repo-only tasks (patch/diff/test runs) should not trigger web search.
-    if any(k in t for k in ["unified diff", "diff --git", ".patch", "git style", "git apply", "git diff"]):
-        return False
-
+    t = (goal or "").strip()
     if not t:
         return False
+    # islower() scans without allocating; only copy when there is something to lowercase.
+    if not t.islower():
+        t = t.lower()
+
+    if _TRIGGER_AC is not None:
+        web = False
+        for _end, is_web in _TRIGGER_AC.iter(t):
+            if not is_web:
+                # Local repo-only tasks (patch/diff/test runs) should not trigger web search.
+                return False
+            web = True
+        return web
+
+    if _LOCAL_ONLY_RE.search(t):
+        return False
+    return _WEB_TRIGGER_RE.search(t) is not None
 
-    triggers = [
-        "look up",
-        "lookup",
-        "search for",
-        "search the web",
-        "find documentation",
-        "docs",
-        "documentation",
-        "api",
-        "parameter",
-        "query parameter",
-        "curl",
-        "how do i",
-        "how to",
-        "what is the correct",
-        "latest",
-        "current",
-        "version",
-        "release notes",
-        "searxng",
-        "install",
-        "setup",
-        "configuration",
-        "tutorial",
-        "example",
-        "best practice",
-        "security",
-        "compatibility",
-        "dependency",
-        "library",
-        "framework",
-        "protocol",
-        "standard",
-    ]
-    return any(x in t for x in triggers)
+
+def _json_loads(s: str) -> Any:
+    """Parse JSON text with orjson when available, else the stdlib parser."""
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+def _find_json_object(s: str) -> str | None:
+    """
+    Return the first balanced {...} substring of `s`, or None.
+
+    Single linear pass tracking brace depth (string literals and escapes are
+    respected), so messy LLM output with many braces cannot trigger regex
+    backtracking.
+    """
+    start = s.find("{")
+    while start >= 0:
+        depth = 0
+        in_str = False
+        escaped = False
+        for i in range(start, len(s)):
+            ch = s[i]
+            if in_str:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return s[start : i + 1]
+        # Unbalanced from this '{' (e.g. an unterminated string); try the next one.
+        start = s.find("{", start + 1)
+    return None
+
+
+def _stream_until_json_closed(messages: list[dict[str, str]], model_cfg) -> str:
+    """
+    Stream the planner response and stop as soon as the first top-level JSON
+    object is balanced, instead of waiting for trailing prose/tokens.
+    Uses the same brace/string tracking as _find_json_object, incrementally.
+    """
+    parts: list[str] = []
+    depth = 0
+    in_str = False
+    escaped = False
+    stream = chat_completion_stream(messages=messages, model_cfg=model_cfg)
+    try:
+        for chunk in stream:
+            parts.append(chunk)
+            for ch in chunk:
+                if in_str:
+                    if escaped:
+                        escaped = False
+                    elif ch == "\\":
+                        escaped = True
+                    elif ch == '"':
+                        in_str = False
+                elif depth and ch == '"':
+                    in_str = True
+                elif ch == "{":
+                    depth += 1
+                elif ch == "}" and depth:
+                    depth -= 1
+                    if depth == 0:
+                        return "".join(parts)
+    finally:
+        stream.close()
+    return "".join(parts)
 
 
 def _try_parse_json_object(raw: str) -> dict[str, Any] | None:
@@ -110,17 +260,16 @@ def _try_parse_json_object(raw: str) -> dict[str, Any] | None:
     # Fast path - direct JSON
     if s.startswith("{") and s.endswith("}"):
         try:
-            obj = json.loads(s)
+            obj = _json_loads(s)
             return obj if isinstance(obj, dict) else None
         except Exception:
             pass
 
     # Extract JSON from markdown or mixed content
-    json_match = re.search(r'\{(?:[^{}]|{[^{}]*})*\}', s)
-    if json_match:
-        candidate = json_match.group(0)
+    candidate = _find_json_object(s)
+    if candidate is not None:
         try:
-            obj = json.loads(candidate)
+            obj = _json_loads(candidate)
             return obj if isinstance(obj, dict) else None
         except Exception:
             pass
@@ -131,80 +280,133 @@ def _try_parse_json_object(raw: str) -> dict[str, Any] | None:
     if a >= 0 and b > a:
         candidate = s[a : b + 1]
         try:
-            obj = json.loads(candidate)
+            obj = _json_loads(candidate)
             return obj if isinstance(obj, dict) else None
         except Exception:
             return None
     return None
 
 
+_FENCE_RE = re.compile(r"```(?:json)?")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_UNQUOTED_KEY_RE = re.compile(r'([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)(\s*:)')
+
+
+def _repair_json(raw: str) -> str:
+    """
+    Cheap in-process fixes for the usual near-miss LLM JSON: markdown fences,
+    trailing commas and unquoted keys. Lets the planner skip the strict-JSON
+    retry round-trip when the output was only slightly malformed.
+    """
+    s = _FENCE_RE.sub("", raw or "")
+    s = _TRAILING_COMMA_RE.sub(r"\1", s)
+    return _UNQUOTED_KEY_RE.sub(r'\1"\2"\3', s)
+
+
+_STRICT_JSON_RETRY_MSG = {
+    "role": "system",
+    "content": (
+        "ERROR: Your last response was not valid JSON.\n"
+        "PRODUCE ONLY JSON with a 'plan' field containing an array of steps.\n"
+        "NO TEXT BEFORE OR AFTER JSON.\n"
+        "Format: {\"plan\": [{\"id\": 1, \"description\": \"...\"}]}\n"
+        "START YOUR RESPONSE WITH { and END WITH }"
+    ),
+    "node": NODE_NAME,
+}
+
+
 def _retry_strict_json(messages: list[dict[str, str]], model_cfg) -> str:
-    retry_msgs = list(messages)
-    retry_msgs.append(
-        {
-            "role": "system",
-            "content": (
-                "ERROR: Your last response was not valid JSON.\n"
-                "PRODUCE ONLY JSON with a 'plan' field containing an array of steps.\n"
-                "NO TEXT BEFORE OR AFTER JSON.\n"
-                "Format: {\"plan\": [{\"id\": 1, \"description\": \"...\"}]}\n"
-                "START YOUR RESPONSE WITH { and END WITH }"
-            ),
-            "node": NODE_NAME,
-        }
-    )
-    return chat_completion(messages=retry_msgs, model_cfg=model_cfg)
+    return chat_completion(messages=[*messages, _STRICT_JSON_RETRY_MSG], model_cfg=model_cfg)
 
 
 
+_DEVELOPMENT_WORDS = frozenset(
+    {"code", "refactor", "test", "tests", "implement", "fix", "patch", "diff", "function", "class", "script", "module", "bug"}
+)
+_SIMPLE_WORDS = frozenset({"list", "show", "print", "summarize", "explain", "describe"})
+_SIMPLE_PHRASES = ("what is", "what are")
+_WORD_RE = re.compile(r"[a-z]+")
+
+
 def _analyze_goal_complexity(goal: str) -> str:
-    """Analyze the goal and return complexity level using an LLM."""
-    from llamia_v3_2.llm_client import chat_completion, DEFAULT_CONFIG
-    
-    prompt = (
-        "You are an expert at analyzing task complexity. ",
-        "Classify the following task into one of these categories: simple, complex, development.",
-        "Simple: tasks that can be completed in 1-2 steps with minimal dependencies.",
-        "Complex: tasks requiring multiple steps, coordination, or research.",
-        "Development: tasks that involve writing or modifying code, including testing.",
-        f"Task: {goal}",
-        "Reason step by step, then output only the category (simple, complex, development)."
-    )
-    
-    response = chat_completion(
-        messages=[{"role": "user", "content": prompt}],
-        model_cfg=DEFAULT_CONFIG.model_for("planner"),
-    ).strip().lower()
-    
-    pass
-    if response not in ['simple', 'complex', 'development']:
-        return 'complex'
-    return response
+    """
+    Classify the goal as simple / complex / development with a local keyword
+    scorer (token-set intersections), instead of a second LLM round-trip.
+    Ties (including no signal) fall back to 'complex'.
+    """
+    g = (goal or "").lower()
+    tokens = frozenset(_WORD_RE.findall(g))
+
+    dev = len(tokens & _DEVELOPMENT_WORDS)
+    simple = len(tokens & _SIMPLE_WORDS) + sum(p in g for p in _SIMPLE_PHRASES)
 
+    if dev > simple:
+        return "development"
+    if simple > dev:
+        return "simple"
+    return "complex"
+
+
+
+def _step_description(step: Any) -> str:
+    if not isinstance(step, dict):
+        return ""
+    desc = step.get("description")
+    if type(desc) is not str:  # JSON parsers already hand us str; only cast odd payloads
+        desc = str(desc or "")
+    return desc.strip()
 
 
 def _enhance_plan_with_context(plan_steps: list[dict]) -> list[PlanStep]:
-    """Normalize plan steps from the planner output."""
-    enhanced_steps = []
-    
-    for i, step in enumerate(plan_steps):
-        if not isinstance(step, dict):
-            continue
-            
-        desc = str(step.get("description", "")).strip()
-        if not desc:
-            continue
-            
-        sid = int(step.get("id", i + 1))
-        
-        # Keep this focused on normalization; goal/notes are handled in the prompt.
-        enhanced_steps.append(PlanStep(
-            id=sid, 
-            description=desc, 
-            status="pending"
-        ))
-    
-    return enhanced_steps
+    """
+    Normalize plan steps from the planner output.
+
+    Steps are numbered sequentially here (model-provided ids are ignored), so no
+    per-step int() cast is needed and a malformed id cannot sink the whole plan.
+    """
+    # Keep this focused on normalization; goal/notes are handled in the prompt.
+    descs = [d for d in map(_step_description, plan_steps) if d]
+    return [PlanStep(id=i, description=d, status="pending") for i, d in enumerate(descs, start=1)]
+
+
+def _has_plan(data: dict[str, Any] | None) -> bool:
+    return isinstance(data, dict) and isinstance(data.get("plan"), list) and bool(data["plan"])
+
+
+def _request_plan(state: LlamiaState, notes: str, cfg) -> tuple[str, dict[str, Any] | None]:
+    """
+    Ask the LLM for a plan (with one strict-JSON retry).
+    Returns (raw text that was parsed last, parsed object or None).
+    """
+    notes_block = f"\n\nWeb research notes:\n{notes}\n" if notes else ""
+
+    # Determine planning strategy based on goal complexity
+    complexity = _analyze_goal_complexity(state.goal)
+
+    messages = [
+        _SYSTEM_MSGS.get(complexity, _SYSTEM_MSGS[None]),
+        # Keep the user prompt minimal; only goal and research notes are injected.
+        {"role": "user", "content": f"Goal: {state.goal}{notes_block}", "node": NODE_NAME},
+    ]
+
+    state.log(f"[{NODE_NAME}] using model={cfg.model} temp={cfg.temperature} complexity={complexity}")
+
+    raw = _stream_until_json_closed(messages, cfg)
+    state.log("[%s] raw LLM output: %r", NODE_NAME, raw)
+
+    data = _try_parse_json_object(raw)
+    if data is None:
+        repaired = _repair_json(raw)
+        data = _try_parse_json_object(repaired)
+        if data is not None:
+            state.log(f"[{NODE_NAME}] repaired LLM output locally; skipping retry")
+            return repaired, data
+
+        raw = _retry_strict_json(messages, cfg)
+        state.log("[%s] raw LLM output (retry): %r", NODE_NAME, raw)
+        data = _try_parse_json_object(raw)
+    return raw, data
 
 
 def planner_node(state: LlamiaState) -> LlamiaState:
@@ -240,42 +442,39 @@ def planner_node(state: LlamiaState) -> LlamiaState:
             f"[planner] requesting web search for goal: {state.research_query!r}",
             node=NODE_NAME,
         )
-        state.log(f"[{NODE_NAME}] routed to research_web query={state.research_query!r}")
+        state.log("[%s] routed to research_web query=%r", NODE_NAME, state.research_query)
         return state
 
     # Prepare context for planning
     notes = (state.research_notes or "").strip()
-    notes_block = f"\n\nWeb research notes:\n{notes}\n" if notes else ""
-    
-    # Determine planning strategy based on goal complexity
-    complexity = _analyze_goal_complexity(state.goal)
-    
-    # Customize prompt based on complexity
-    prompt = PLANNER_SYSTEM_PROMPT
-    if complexity == "complex":
-        prompt += "\nFor complex tasks: break into smaller, manageable phases with verification between phases."
-    elif complexity == "simple":
-        prompt += "\nFor simple tasks: focus on direct, efficient execution steps."
-    elif complexity == "development":
-        prompt += "\nFor development tasks: include testing and verification steps."
-
-    messages = [
-        {"role": "system", "content": prompt, "node": NODE_NAME},
-        # Keep the user prompt minimal; only goal and research notes are injected.
-        {"role": "user", "content": f"Goal: {state.goal}{notes_block}", "node": NODE_NAME},
-    ]
-
     cfg = DEFAULT_CONFIG.model_for("planner")
-    state.log(f"[{NODE_NAME}] using model={cfg.model} temp={cfg.temperature} complexity={complexity}")
 
-    raw = chat_completion(messages=messages, model_cfg=cfg)
-    state.log(f"[{NODE_NAME}] raw LLM output: {raw!r}")
+    cache_key = plan_cache_key(cfg.model, cfg.temperature, state.goal, notes)
+    template_scope = plan_template_scope(cfg.model, cfg.temperature)
 
-    data = _try_parse_json_object(raw)
-    if data is None:
-        raw2 = _retry_strict_json(messages, cfg)
-        state.log(f"[{NODE_NAME}] raw LLM output (retry): {raw2!r}")
-        data = _try_parse_json_object(raw2)
+    # Re-entry with the same goal + notes (e.g. loop-back from research): the current plan still holds.
+    if state.plan and state.plan_fingerprint == cache_key:
+        state.log(f"[{NODE_NAME}] plan unchanged; reusing {len(state.plan)} steps")
+        state.next_agent = None
+        return state
+
+    cached = get_cached_plan(cache_key)
+    goal_vec = None
+    if cached is not None:
+        state.log(f"[{NODE_NAME}] plan cache hit; skipping LLM call")
+        data = _try_parse_json_object(cached)
+    else:
+        # Templates are goal-only; plans grounded in research notes are not reused across goals.
+        goal_vec = embed_goal(state.goal) if not notes else None
+        template = find_plan_template(goal_vec, template_scope)
+        if template is not None:
+            state.log(f"[{NODE_NAME}] plan template hit (similar goal); skipping LLM call")
+            data = {"plan": [{"id": i, "description": d} for i, d in enumerate(template, start=1)]}
+            goal_vec = None  # already stored
+        else:
+            raw, data = _request_plan(state, notes, cfg)
+            if _has_plan(data):
+                put_cached_plan(cache_key, raw)
 
     plan_steps: list[PlanStep] = []
     try:
@@ -286,19 +485,18 @@ def planner_node(state: LlamiaState) -> LlamiaState:
         if not isinstance(raw_plan, list):
             raise ValueError("plan field is not a list")
 
-        # Enhance the plan with context and validation
-        enhanced_plan = _enhance_plan_with_context(raw_plan)
-        plan_steps = enhanced_plan
+        # Normalize + number the steps in one pass
+        plan_steps = _enhance_plan_with_context(raw_plan)
 
         if not plan_steps:
             raise ValueError("empty plan")
 
-        # Ensure plan steps are properly numbered sequentially
-        for i, step in enumerate(plan_steps, start=1):
-            step.id = i
+        store_plan_template(goal_vec, cache_key, template_scope, [step.description for step in plan_steps])
+        state.plan_fingerprint = cache_key
 
     except Exception as e:
         state.log(f"[{NODE_NAME}] ERROR parsing plan JSON: {e!r}")
+        state.plan_fingerprint = None
         # Fallback: create a simple plan
         plan_steps = [
             PlanStep(
@@ -310,7 +508,7 @@ def planner_node(state: LlamiaState) -> LlamiaState:
 
     state.plan = plan_steps
     state.next_agent = None  # Reset routing - let execution flow naturally
-    state.log(f"[{NODE_NAME}] created {len(plan_steps)} plan steps: {[step.description for step in plan_steps]}")
+    state.log("[%s] created %d plan steps: %r", NODE_NAME, len(plan_steps), [step.description for step in plan_steps])
     
     # Add plan summary to messages for context
     if plan_steps:
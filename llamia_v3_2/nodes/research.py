@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+
 from ..state import LlamiaState
 from ..config import DEFAULT_CONFIG
 from ..tools.rag_index import ingest_repo, query_repo
@@ -7,17 +9,37 @@ from ..tools.rag_index import ingest_repo, query_repo
 NODE_NAME = "research"
 
 
-def _latest_user_text(state: LlamiaState) -> str:
-    for m in reversed(state.messages):
-        if m.get("role") == "user":
-            return (m.get("content") or "").strip()
-    return ""
+def _ingest_and_query(q: str, force: bool) -> tuple[int, str]:
+    """
+    Without force, ingest_repo is normally just a warm-index check, so run the
+    query alongside it. The speculative answer is kept only if nothing was
+    ingested; if the index had to be built, query again against it.
+    With force, changed files are re-indexed first and then the index is queried.
+    """
+    top_k = DEFAULT_CONFIG.rag_top_k
+    if force:
+        return ingest_repo(force=True), query_repo(query=q, top_k=top_k)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        ingest_f = pool.submit(ingest_repo, force=False)
+        query_f = pool.submit(query_repo, query=q, top_k=top_k)
+        ingested = ingest_f.result()
+        try:
+            answer = query_f.result()
+        except Exception:
+            if not ingested:
+                raise
+            answer = ""
+
+    if ingested:
+        answer = query_repo(query=q, top_k=top_k)
+    return ingested, answer
 
 
 def research_node(state: LlamiaState) -> LlamiaState:
     state.log(f"[{NODE_NAME}] starting")
 
-    user_text = _latest_user_text(state)
+    user_text = state.latest_user_text()
     if not user_text:
         state.log(f"[{NODE_NAME}] no user text; skipping")
         return state
@@ -33,12 +55,9 @@ def research_node(state: LlamiaState) -> LlamiaState:
     elif low.startswith("research:"):
         q = q.split(":", 1)[1].strip()
 
-    # (Re)ingest repo
-    ingested = ingest_repo(force=force)
+    # (Re)ingest repo + query
+    ingested, answer = _ingest_and_query(q, force)
     state.log(f"[{NODE_NAME}] ingested_docs={ingested} force={force}")
-
-    # Query
-    answer = query_repo(query=q, top_k=DEFAULT_CONFIG.rag_top_k)
     state.research_notes = answer
 
     state.add_message(
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
-import httpx
+from concurrent.futures import ThreadPoolExecutor
 
 from ..state import LlamiaState
 from ..config import DEFAULT_CONFIG
+from ..tools.web_search import WebResult, searxng_search
 
 NODE_NAME = "research_web"
 
+_RETURN_TARGETS = frozenset({"planner", "coder", "chat", "research_web"})
+
 
 def _resolve_return_after_web(state: LlamiaState) -> str:
     target = str(getattr(state, "return_after_web", "") or "").strip()
-    if target in {"planner", "coder", "chat", "research_web"}:
+    if target in _RETURN_TARGETS:
         return target
     return "planner" if state.mode == "task" else "chat"
 
@@ -26,6 +29,45 @@ def _pop_web_queue(state: LlamiaState) -> str | None:
     return None
 
 
+def _search_one(query: str, top_k: int) -> list[WebResult]:
+    return searxng_search(
+        base_url=DEFAULT_CONFIG.searxng_url,
+        query=query,
+        top_k=top_k,
+        timeout_s=DEFAULT_CONFIG.web_search_timeout_s,
+    )
+
+
+def _fetch_all(queries: list[str], top_k: int) -> list[list[WebResult] | Exception]:
+    """
+    Run all queries concurrently over the shared pooled client in tools.web_search.
+    Results (or the exception raised for that query) come back in query order.
+    """
+    def _safe(q: str) -> list[WebResult] | Exception:
+        try:
+            return _search_one(q, top_k)
+        except Exception as e:
+            return e
+
+    if len(queries) == 1:
+        return [_safe(queries[0])]
+
+    with ThreadPoolExecutor(max_workers=min(len(queries), 8)) as pool:
+        return list(pool.map(_safe, queries))
+
+
+def _format_result(i: int, item: WebResult) -> str:
+    return f"{i}. {item.title}\n   {item.url}\n   {item.content}"
+
+
+def _format_results(query: str, results: list[WebResult]) -> str:
+    # One join over a generator: no intermediate list growth per result.
+    header = f"[web_search results] top_k={len(results)} query={query!r}"
+    if not results:
+        return header
+    return header + "\n" + "\n".join(_format_result(i, item) for i, item in enumerate(results, 1))
+
+
 def research_web_node(state: LlamiaState) -> LlamiaState:
     state.log(f"[{NODE_NAME}] starting")
 
@@ -47,50 +89,43 @@ def research_web_node(state: LlamiaState) -> LlamiaState:
         state.next_agent = _resolve_return_after_web(state)
         return state
 
+    # Drain the whole queue so all pending queries go out concurrently.
+    queries = [query]
+    while True:
+        q = _pop_web_queue(state)
+        if not q:
+            break
+        queries.append(q)
+
     # only emit marker if we really have a query
-    state.add_message(
-        "system",
-        f"[web_search] provider=searxng url={DEFAULT_CONFIG.searxng_url!r} query={query!r}",
-        node=NODE_NAME,
-    )
+    for q in queries:
+        state.add_message(
+            "system",
+            f"[web_search] provider=searxng url={DEFAULT_CONFIG.searxng_url!r} query={q!r}",
+            node=NODE_NAME,
+        )
 
-    url = DEFAULT_CONFIG.searxng_url.rstrip("/") + "/search"
-    params = {"q": query, "format": "json"}
-
-    try:
-        with httpx.Client(timeout=DEFAULT_CONFIG.web_search_timeout_s) as client:
-            r = client.get(url, params=params)
-            r.raise_for_status()
-            data = r.json()
-    except Exception as e:
-        state.add_message("system", f"[web_search] ERROR: {e!r}", node=NODE_NAME)
-        state.log(f"[{NODE_NAME}] error={e!r}")
-        state.research_query = None
-        state.next_agent = _resolve_return_after_web(state)
-        return state
+    top_k = max(1, int(DEFAULT_CONFIG.web_search_top_k))
 
-    results = (data.get("results") or [])[: max(1, int(DEFAULT_CONFIG.web_search_top_k))]
+    blocks: list[str] = []
+    got = 0
+    for q, outcome in zip(queries, _fetch_all(queries, top_k)):
+        if isinstance(outcome, Exception):
+            state.add_message("system", f"[web_search] ERROR: {outcome!r}", node=NODE_NAME)
+            state.log("[%s] query=%r error=%r", NODE_NAME, q, outcome)
+            continue
 
-    lines = [f"[web_search results] top_k={len(results)} query={query!r}"]
-    for i, item in enumerate(results, 1):
-        title = (item.get("title") or "").strip()
-        link = (item.get("url") or "").strip()
-        snippet = (item.get("content") or "").strip()
-        lines.append(f"{i}. {title}\n   {link}\n   {snippet}")
+        results = outcome
+        got += len(results)
 
-    notes = "\n".join(lines)
-    state.research_notes = notes
-    state.add_message("system", notes, node=NODE_NAME)
+        block = _format_results(q, results)
+        blocks.append(block)
+        state.add_message("system", block, node=NODE_NAME)
 
-    next_query = _pop_web_queue(state)
-    if next_query:
-        state.research_query = next_query
-        state.next_agent = "research_web"
-        state.log(f"[{NODE_NAME}] queued next_query; looping to research_web")
-        return state
+    if blocks:
+        state.research_notes = "\n\n".join(blocks)
 
     state.research_query = None
     state.next_agent = _resolve_return_after_web(state)
-    state.log(f"[{NODE_NAME}] got_results={len(results)} next_agent={state.next_agent}")
+    state.log(f"[{NODE_NAME}] queries={len(queries)} got_results={got} next_agent={state.next_agent}")
     return state
-
@@ -14,23 +14,31 @@ Key Components:
 - run_repl: Main execution entry point
 """
 
-from collections import Counter
+from dataclasses import replace
 import sys
 import time
 from pathlib import Path
 from typing import Any, Optional
 
 from llamia_v3_2.graph import build_llamia_graph
-from llamia_v3_2.state import LlamiaState
+from llamia_v3_2.state import CancelToken, LlamiaState
 
 from .config import ReplConfig
 from .contract import validate_task_contract
 from .input_utils import read_user_input_block
-from .logging_utils import append_jsonl, read_if_exists, setup_run_logger
+from .logging_utils import JsonlWriter, read_if_exists, setup_run_logger
 from .paths import RepoPaths
-from .repo_utils import dirty_outside_workspace, git_ls_files, git_restore_paths, repo_snapshot_text
+from .repo_utils import ValidationArena, cached_repo_snapshot_text, dirty_outside_workspace, git_ls_files, git_restore_paths
 from .state_utils import coerce_to_state, state_snapshot
-from .timeouts import InvokeTimeout, invoke_timeout
+from .timeouts import InvokeTimeout, call_with_timeout
+
+
+_BANNER = (
+    "Llamia v3.2 (LangGraph + planner + coder + executor + chat). Type 'exit' to quit.\n\n"
+    "Tips:\n"
+    "  - Normal message: regular chat mode\n"
+    "  - 'task: build me X': task mode => planner, coder (writes into workspace/), executor (runs safe commands), then chat.\n\n"
+)
 
 
 def _reset_turn_fields(state: LlamiaState) -> None:
@@ -68,6 +76,58 @@ def _ensure_turn_fields_exist(state: LlamiaState) -> None:
         state.intent_source = None
     if not hasattr(state, "return_after_research"):
         state.return_after_research = "planner"
+    if not isinstance(getattr(state, "trace", None), list):
+        # Routers append to trace directly; coerce once per session, not per turn.
+        state.trace = list(getattr(state, "trace", None) or [])
+
+
+def _snapshot_fields(state: LlamiaState, paths: RepoPaths) -> dict[str, Any]:
+    """
+    State snapshot plus the IMPROVEMENTS artifacts, for interrupt/contract-failure records.
+    """
+    return {
+        "snapshot": state_snapshot(state),
+        "improvements_patch": read_if_exists(paths, "workspace/IMPROVEMENTS.patch"),
+        "improvements_md": read_if_exists(paths, "workspace/IMPROVEMENTS.md"),
+    }
+
+
+def _detached_copy(state: LlamiaState) -> LlamiaState:
+    """
+    Copy of `state` with fresh list containers. LangGraph hands the input's lists
+    to the nodes as-is, so an invocation abandoned after a timeout would otherwise
+    keep appending to the REPL's messages/trace while the next turn runs.
+    """
+    return replace(
+        state,
+        messages=list(state.messages),
+        plan=list(state.plan),
+        pending_patches=list(state.pending_patches),
+        applied_patches=list(state.applied_patches),
+        web_queue=list(state.web_queue),
+        exec_results=list(state.exec_results),
+        last_exec_results=list(state.last_exec_results),
+        trace=list(state.trace),
+    )
+
+
+def _invoke_graph(app: Any, state: LlamiaState, cfg: ReplConfig) -> Any:
+    """
+    One bounded app.invoke on a detached copy of `state`. The CancelToken travels
+    in the run config, not in the state, so the state stays serializable for the
+    node cache.
+    """
+    cancel_token = CancelToken()
+    return call_with_timeout(
+        app.invoke,
+        cfg.invoke_timeout_s,
+        _detached_copy(state),
+        cancel_token=cancel_token,
+        config={
+            "recursion_limit": cfg.invoke_recursion_limit,
+            "configurable": {"cancel_token": cancel_token},
+        },
+    )
 
 
 def run_repl(config: Optional[ReplConfig] = None) -> int:
@@ -87,268 +147,269 @@ def run_repl(config: Optional[ReplConfig] = None) -> int:
     state = LlamiaState()
     _ensure_turn_fields_exist(state)
 
-    app = build_llamia_graph()
-
-    print("Llamia v3.2 (LangGraph + planner + coder + executor + chat). Type 'exit' to quit.\n")
-    print("Tips:")
-    print("  - Normal message: regular chat mode")
-    print("  - 'task: build me X': task mode => planner, coder (writes into workspace/), executor (runs safe commands), then chat.\n")
-
-    while True:
-        user_input = read_user_input_block()
-        if user_input is None:
-            print("\nBye.")
-            logger.info("[repl] exit at prompt")
-            append_jsonl(jsonl_path, {"event": "repl_exit", "reason": "prompt_exit", "ts": time.time()})
-            return 0
-
-        if not user_input.strip():
-            continue
-
-        if user_input.strip().lower() in {"exit", "quit"}:
-            print("Bye.")
-            logger.info("[repl] user requested exit")
-            append_jsonl(jsonl_path, {"event": "repl_exit", "reason": "user_exit", "ts": time.time()})
-            return 0
-
-        # Turn bookkeeping
-        state.turn_id += 1
-        _reset_turn_fields(state)
-
-        before_applied_len = len(getattr(state, "applied_patches", []))
-        before_exec_len = len(getattr(state, "exec_results", []))
-        before_msg_len = len(getattr(state, "messages", []))
-        before_mode = getattr(state, "mode", None)
-
-        append_jsonl(
-            jsonl_path,
-            {
-                "event": "turn_start",
-                "turn_id": state.turn_id,
-                "mode_before": before_mode,
-                "user_input": user_input,
-                "ts": time.time(),
-            },
-        )
-
-        # Optional repo snapshot injection for task grounding
-        if cfg.inject_repo_snapshot and user_input.lstrip().lower().startswith("task:"):
-            snap = repo_snapshot_text(paths, max_files=cfg.repo_snapshot_max_files)
-            state.add_message("system", f"[repo_snapshot]\n{snap}", node="main")
-
-        state.add_message("user", user_input, node="repl")
-
-        baseline_dirty_outside_ws = dirty_outside_workspace(paths)
-
-        attempt = 0
-        raw_result: Any = None
-
-        while True:
-            attempt += 1
-            t0 = time.time()
-
-            try:
-                with invoke_timeout(cfg.invoke_timeout_s):
-                    raw_result = app.invoke(state, config={"recursion_limit": cfg.invoke_recursion_limit})
-            except InvokeTimeout as e:
-                dt = time.time() - t0
-                msg = f"invoke exceeded {cfg.invoke_timeout_s}s timeout"
-                state.add_message("system", f"[main] {msg}", node="main")
-                print(f"llamia> [timed out] {msg}\n")
-                logger.warning(f"[turn {state.turn_id}] TIMEOUT after {dt:.2f}s: {msg}")
-                append_jsonl(
-                    jsonl_path,
-                    {
-                        "event": "invoke_timeout",
-                        "turn_id": state.turn_id,
-                        "attempt": attempt,
-                        "elapsed_s": dt,
-                        "error": str(e),
-                        "ts": time.time(),
-                    },
-                )
-                raw_result = None
-                break
-            except KeyboardInterrupt:
-                dt = time.time() - t0
-                print("\nllamia> [interrupted] (Ctrl+C). You can type 'exit' to quit.\n")
-                logger.warning(f"[turn {state.turn_id}] INTERRUPTED after {dt:.2f}s")
-                append_jsonl(
-                    jsonl_path,
-                    {
-                        "elapsed_s": dt,
-                        "event": "invoke_interrupt_snapshot",
-                        "turn_id": state.turn_id,
-                        "attempt": attempt,
-                        "snapshot": state_snapshot(state),
-                        "improvements_patch": read_if_exists(paths, "workspace/IMPROVEMENTS.patch"),
-                        "improvements_md": read_if_exists(paths, "workspace/IMPROVEMENTS.md"),
-                        "ts": time.time(),
-                    },
-                )
-                raw_result = None
-                break
+    app = build_llamia_graph(node_cache=cfg.enable_node_cache, cache_ttl=cfg.invoke_timeout_s)
 
-            dt = time.time() - t0
-            state = coerce_to_state(raw_result)
+    sys.stdout.write(_BANNER)
 
-            append_jsonl(
-                jsonl_path,
+    with JsonlWriter(jsonl_path) as jsonl:
+        while True:
+            # Turn boundary: push the previous turn's events to disk before blocking on input.
+            jsonl.flush()
+            user_input = read_user_input_block()
+            if user_input is None:
+                print("\nBye.")
+                logger.info("[repl] exit at prompt")
+                jsonl.append({"event": "repl_exit", "reason": "prompt_exit"})
+                return 0
+
+            # Strip once; only the short head is lowercased for the exit/task checks.
+            stripped_input = user_input.strip()
+            if not stripped_input:
+                continue
+
+            if len(stripped_input) <= 4 and stripped_input.lower() in {"exit", "quit"}:
+                print("Bye.")
+                logger.info("[repl] user requested exit")
+                jsonl.append({"event": "repl_exit", "reason": "user_exit"})
+                return 0
+
+            is_task_input = stripped_input[:5].lower() == "task:"
+
+            # Turn bookkeeping
+            state.turn_id += 1
+            _reset_turn_fields(state)
+
+            before_applied_len = len(state.applied_patches)
+            before_exec_len = len(state.exec_results)
+            before_msg_len = len(state.messages)
+            before_mode = state.mode
+
+            jsonl.append(
                 {
-                    "event": "invoke_done",
+                    "event": "turn_start",
                     "turn_id": state.turn_id,
-                    "attempt": attempt,
-                    "elapsed_s": dt,
-                    "mode_after": getattr(state, "mode", None),
-                    "ts": time.time(),
+                    "mode_before": before_mode,
+                    "user_input": user_input,
                 },
             )
 
-            # Contract validation for tasks
-            if user_input.lstrip().lower().startswith("task:"):
-                failures, newly_dirty = validate_task_contract(paths, user_input, baseline_dirty_outside_ws)
-                if failures:
-                    append_jsonl(
-                        jsonl_path,
+            # Optional repo snapshot injection for task grounding
+            if cfg.inject_repo_snapshot and is_task_input:
+                snap = cached_repo_snapshot_text(paths, max_files=cfg.repo_snapshot_max_files)
+                state.add_message("system", f"[repo_snapshot]\n{snap}", node="main")
+
+            state.add_message("user", user_input, node="repl")
+
+            baseline_dirty_outside_ws = dirty_outside_workspace(paths)
+
+            attempt = 0
+            raw_result: Any = None
+            patch_targets: list[str] | None = None
+            # One validation worktree per turn, reset between contract attempts and
+            # removed when the block exits, including via Ctrl+C or an exception.
+            with ValidationArena(paths) as arena:
+                while True:
+                    attempt += 1
+                    t0 = time.monotonic_ns()
+
+                    try:
+                        raw_result = _invoke_graph(app, state, cfg)
+                    except InvokeTimeout as e:
+                        dt = (time.monotonic_ns() - t0) / 1e9
+                        msg = f"invoke exceeded {cfg.invoke_timeout_s}s timeout"
+                        state.add_message("system", f"[main] {msg}", node="main")
+                        print(f"llamia> [timed out] {msg}\n")
+                        logger.warning(f"[turn {state.turn_id}] TIMEOUT after {dt:.2f}s: {msg}")
+                        jsonl.append(
+                            {
+                                "event": "invoke_timeout",
+                                "turn_id": state.turn_id,
+                                "attempt": attempt,
+                                "elapsed_s": dt,
+                                "error": str(e),
+                            },
+                        )
+                        raw_result = None
+                        break
+                    except KeyboardInterrupt:
+                        dt = (time.monotonic_ns() - t0) / 1e9
+                        print("\nllamia> [interrupted] (Ctrl+C). You can type 'exit' to quit.\n")
+                        logger.warning(f"[turn {state.turn_id}] INTERRUPTED after {dt:.2f}s")
+                        jsonl.append(
+                            lambda: {
+                                "elapsed_s": dt,
+                                "event": "invoke_interrupt_snapshot",
+                                "turn_id": state.turn_id,
+                                "attempt": attempt,
+                                **_snapshot_fields(state, paths),
+                            },
+                        )
+                        raw_result = None
+                        break
+
+                    dt = (time.monotonic_ns() - t0) / 1e9
+                    state = coerce_to_state(raw_result)
+
+                    jsonl.append(
                         {
-                            "failures": failures,
-                            "event": "contract_fail_snapshot",
+                            "event": "invoke_done",
                             "turn_id": state.turn_id,
                             "attempt": attempt,
-                            "snapshot": state_snapshot(state),
-                            "improvements_patch": read_if_exists(paths, "workspace/IMPROVEMENTS.patch"),
-                            "improvements_md": read_if_exists(paths, "workspace/IMPROVEMENTS.md"),
-                            "ts": time.time(),
+                            "elapsed_s": dt,
+                            "mode_after": state.mode,
                         },
                     )
 
-                    print("llamia> [contract violation] The task output did not satisfy requirements:")
-                    for f in failures:
-                        print(f"  - {f}")
-                    print("")
-
-                    # Revert any newly dirtied tracked files so retries are safe
-                    git_restore_paths(paths, newly_dirty)
-
-                    if attempt >= cfg.max_contract_retries:
-                        state.add_message("system", "[main] Contract failed after max retries.", node="main")
-                        break
-
-                    # Create a corrective hint to push it back to reality.
-                    tracked = git_ls_files(paths)
-                    filtered = [
-                        p
-                        for p in tracked
-                        if not p.startswith(("workspace/", ".venv/", ".llamia_chroma/"))
-                        and not p.endswith((".bin", ".sqlite3", ".db"))
-                    ]
-                    tracked_hint = ""
-                    if any("Patch does not touch" in f for f in failures) or any("Patch failed" in f for f in failures):
-                        sample = filtered[:60]
-                        if sample:
-                            tracked_hint = "\nAllowed patch targets (git ls-files, filtered):\n- " + "\n- ".join(sample) + "\n"
-
-                    fix_msg = (
-                        "[main] CONTRACT VIOLATION.\n"
-                        "You MUST fix the failures below, using ONLY workspace/ outputs.\n"
-                        "Do NOT claim success until all are satisfied.\n\n"
-                        "Failures:\n- " + "\n- ".join(failures) + "\n"
-                        + tracked_hint
-                        + "\nNow regenerate the required artifacts.\n"
-                        "- If a unified diff was requested, it MUST modify existing git-tracked files.\n"
-                        "- The patch must apply cleanly to HEAD (git apply --check) and compile (python -m compileall).\n"
-                        "- IMPROVEMENTS.md must cite the exact files changed and include code excerpts.\n"
-                    )
-
-                    state.fix_instructions = fix_msg
-                    _reset_turn_fields(state)
-                    state.exec_request = None
-                    state.last_exec_results = []
-                    state.add_message("system", fix_msg, node="main")
-                    continue
-
-            break
-
-        if raw_result is None:
-            continue
+                    # Contract validation for tasks
+                    if is_task_input:
+                        failures, newly_dirty = validate_task_contract(
+                            paths, user_input, baseline_dirty_outside_ws, arena=arena
+                        )
+                        if failures:
+                            jsonl.append(
+                                lambda: {
+                                    "failures": failures,
+                                    "event": "contract_fail_snapshot",
+                                    "turn_id": state.turn_id,
+                                    "attempt": attempt,
+                                    **_snapshot_fields(state, paths),
+                                },
+                            )
+
+                            print("llamia> [contract violation] The task output did not satisfy requirements:")
+                            for f in failures:
+                                print(f"  - {f}")
+                            print("")
+
+                            # Revert any newly dirtied tracked files so retries are safe
+                            git_restore_paths(paths, newly_dirty)
+
+                            if attempt >= cfg.max_contract_retries:
+                                state.add_message("system", "[main] Contract failed after max retries.", node="main")
+                                break
+
+                            # Create a corrective hint to push it back to reality.
+                            tracked_hint = ""
+                            if any("Patch does not touch" in f or "Patch failed" in f for f in failures):
+                                if patch_targets is None:
+                                    # Listed once per turn; failed attempts are reverted, so it can't change.
+                                    patch_targets = [
+                                        p
+                                        for p in git_ls_files(paths)
+                                        if not p.startswith(("workspace/", ".venv/", ".llamia_chroma/"))
+                                        and not p.endswith((".bin", ".sqlite3", ".db"))
+                                    ][:60]
+                                sample = patch_targets
+                                if sample:
+                                    tracked_hint = "\nAllowed patch targets (git ls-files, filtered):\n- " + "\n- ".join(sample) + "\n"
+
+                            fix_msg = (
+                                "[main] CONTRACT VIOLATION.\n"
+                                "You MUST fix the failures below, using ONLY workspace/ outputs.\n"
+                                "Do NOT claim success until all are satisfied.\n\n"
+                                "Failures:\n- " + "\n- ".join(failures) + "\n"
+                                + tracked_hint
+                                + "\nNow regenerate the required artifacts.\n"
+                                "- If a unified diff was requested, it MUST modify existing git-tracked files.\n"
+                                "- The patch must apply cleanly to HEAD (git apply --check) and compile (python -m compileall).\n"
+                                "- IMPROVEMENTS.md must cite the exact files changed and include code excerpts.\n"
+                            )
+
+                            state.fix_instructions = fix_msg
+                            _reset_turn_fields(state)
+                            state.exec_request = None
+                            state.last_exec_results = []
+                            state.add_message("system", fix_msg, node="main")
+                            continue
+
+                    break
+
+            if raw_result is None:
+                continue
+
+            # coerce_to_state always yields a LlamiaState, so read each field once directly.
+            after_mode = state.mode
+            messages = state.messages
+            plan = state.plan
+            exec_req = state.exec_request
+            web_results = state.web_results
+            new_applied = state.applied_patches[before_applied_len:]
+            new_exec = state.exec_results[before_exec_len:]
+            new_msgs = messages[before_msg_len:]
+
+            if not messages or messages[-1].get("role") != "assistant":
+                print("llamia> [no assistant reply produced]\n")
+                jsonl.append(
+                    {
+                        "event": "turn_end",
+                        "turn_id": state.turn_id,
+                        "mode_after": after_mode,
+                        "assistant": None,
+                        "new_messages": new_msgs,
+                        "new_applied_patches": new_applied,
+                        "new_exec_results": new_exec,
+                    },
+                )
+                continue
 
-        after_mode = getattr(state, "mode", None)
-        new_applied = state.applied_patches[before_applied_len:] if getattr(state, "applied_patches", None) else []
-        new_exec = state.exec_results[before_exec_len:] if getattr(state, "exec_results", None) else []
-        new_msgs = state.messages[before_msg_len:] if getattr(state, "messages", None) else []
+            last = messages[-1]
+            assistant_text = last.get("content", "")
+            print(f"llamia> {assistant_text}\n")
+            sys.stdout.flush()
 
-        if not state.messages or state.messages[-1].get("role") != "assistant":
-            print("llamia> [no assistant reply produced]\n")
-            append_jsonl(
-                jsonl_path,
+            jsonl.append(
                 {
                     "event": "turn_end",
                     "turn_id": state.turn_id,
+                    "mode_before": before_mode,
                     "mode_after": after_mode,
-                    "assistant": None,
+                    "assistant": assistant_text,
+                    "plan": plan,
+                    "exec_request": exec_req,
                     "new_messages": new_msgs,
                     "new_applied_patches": new_applied,
                     "new_exec_results": new_exec,
-                    "ts": time.time(),
+                    "web_results": web_results,
+                    "trace": state.trace,
                 },
             )
-            continue
-
-        last = state.messages[-1]
-        assistant_text = last.get("content", "")
-        print(f"llamia> {assistant_text}\n")
-        sys.stdout.flush()
-
-        append_jsonl(
-            jsonl_path,
-            {
-                "event": "turn_end",
-                "turn_id": state.turn_id,
-                "mode_before": before_mode,
-                "mode_after": after_mode,
-                "assistant": assistant_text,
-                "plan": getattr(state, "plan", []),
-                "exec_request": getattr(state, "exec_request", None),
-                "new_messages": new_msgs,
-                "new_applied_patches": new_applied,
-                "new_exec_results": new_exec,
-                "web_results": getattr(state, "web_results", None),
-                "trace": getattr(state, "trace", None),
-                "ts": time.time(),
-            },
-        )
-
-        # Pretty-print task-mode side channel info (plan/files/exec results).
-        if state.mode == "task":
-            if state.plan:
-                print("  [plan]")
-                for step in state.plan:
-                    print(f"   - ({step.id}) [{step.status}] {step.description}")
-
-            if new_applied:
-                counts = Counter((p.file_path, p.apply_mode) for p in new_applied)
-                print("  [files]")
-                for (fp, mode), n in counts.items():
-                    suffix = f" x{n}" if n > 1 else ""
-                    print(f"   - {fp} ({mode}){suffix}")
-
-            if state.exec_request and state.exec_request.commands:
-                print("  [suggested commands]")
-                print(f"   - workdir: {state.exec_request.workdir}")
-                for cmd in state.exec_request.commands:
-                    print(f"   - {cmd}")
-
-            if new_exec:
-                print("  [exec results]")
-                for r in new_exec:
-                    status = "OK" if r.returncode == 0 else f"FAILED ({r.returncode})"
-                    print(f"   - {r.command} -> {status}")
-
-            if state.web_results:
-                print("  [web results]")
-                print("   " + str(state.web_results).replace("\n", "\n   "))
-
-            print("")
-            sys.stdout.flush()
+
+            # Pretty-print task-mode side channel info (plan/files/exec results), written in one go.
+            if after_mode == "task":
+                out: list[str] = []
+                if plan:
+                    out.append("  [plan]")
+                    for step in plan:
+                        out.append(f"   - ({step.id}) [{step.status}] {step.description}")
+
+                if new_applied:
+                    counts: dict[tuple[str, str], int] = {}
+                    for p in new_applied:
+                        k = (p.file_path, p.apply_mode)
+                        counts[k] = counts.get(k, 0) + 1
+                    out.append("  [files]")
+                    for (fp, mode), n in counts.items():
+                        suffix = f" x{n}" if n > 1 else ""
+                        out.append(f"   - {fp} ({mode}){suffix}")
+
+                if exec_req and exec_req.commands:
+                    out.append("  [suggested commands]")
+                    out.append(f"   - workdir: {exec_req.workdir}")
+                    for cmd in exec_req.commands:
+                        out.append(f"   - {cmd}")
+
+                if new_exec:
+                    out.append("  [exec results]")
+                    for r in new_exec:
+                        status = "OK" if r.returncode == 0 else f"FAILED ({r.returncode})"
+                        out.append(f"   - {r.command} -> {status}")
+
+                if web_results:
+                    out.append("  [web results]")
+                    out.append("   " + str(web_results).replace("\n", "\n   "))
+
+                out.append("\n")
+                sys.stdout.write("\n".join(out))
+                sys.stdout.flush()
 
     return 0
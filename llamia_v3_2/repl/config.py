@@ -17,7 +17,7 @@ class ReplConfig:
     # Hard cap on LangGraph recursion; prevents runaway internal loops.
     invoke_recursion_limit: int = 100
 
-    # Wall-clock cap per turn. Enforced via SIGALRM on Linux/macOS. No-op on Windows.
+    # Wall-clock cap per turn. Enforced by waiting on a worker thread (all platforms).
     invoke_timeout_s: int = 600
 
     # How many times we auto-retry if a “task:” output violates the contract.
@@ -26,3 +26,9 @@ class ReplConfig:
     # Inject a truncated repo tree into system prompt for tasks to reduce hallucinations.
     inject_repo_snapshot: bool = True
     repo_snapshot_max_files: int = 250
+
+    # Memoize the pure routing nodes (intent_classifier/intent_router) with LangGraph's
+    # node cache when the installed langgraph supports it. Entries expire per turn timeout.
+    # Off by default: the key covers the whole input state, and every invoke in the REPL
+    # adds a message first, so the REPL itself never hits; it only pays for storing it.
+    enable_node_cache: bool = False
@@ -1,73 +1,143 @@
 from __future__ import annotations
 
 import re
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Set, Tuple
+from typing import Any, List, Set, Tuple
 
 from .paths import RepoPaths
-from .repo_utils import check_patch_in_clean_worktree, dirty_outside_workspace, git_ls_files
+from .repo_utils import ValidationArena, check_patch_in_clean_worktree, dirty_outside_workspace, git_ls_files
 
 
-_DIFF_FILE_RE = re.compile(r"^diff --git a/(.+?) b/(.+?)$", re.MULTILINE)
-_WS_PATH_RE = re.compile(r"(workspace/[A-Za-z0-9._\\-\\/]+)")
+_WS_PATH_RE = re.compile(r"workspace/[A-Za-z0-9._/\-]+")
+
+# Patch-request keywords, matched case-insensitively without lowercasing the whole prompt.
+_PATCH_PROMPT_RE = re.compile(r"improvements\.patch|unified diff|git style", re.IGNORECASE)
+_CREATE_WS_PATCH_RE = re.compile(r"\A(?=.*?create workspace/)(?=.*?\.patch)", re.IGNORECASE | re.DOTALL)
+
+
+# Contract validation runs once per retry attempt with the same user_input, so the
+# pure prompt checks are memoized and the repo/patch-derived results are cached by mtime.
+_VALIDATION_CACHE: dict[Any, Any] = {}
+_VALIDATION_CACHE_MAX = 32
+
+
+@lru_cache(maxsize=64)
+def _required_workspace_paths(user_input: str) -> Tuple[str, ...]:
+    # dict.fromkeys dedupes while keeping first-seen order.
+    return tuple(dict.fromkeys(p for m in _WS_PATH_RE.finditer(user_input) if (p := m.group(0).rstrip("."))))
 
 
 def extract_required_workspace_paths(user_input: str) -> List[str]:
     """
     Any explicit 'workspace/...' in the user input is treated as required output.
     """
-    found = _WS_PATH_RE.findall(user_input)
-    out: list[str] = []
-    seen: set[str] = set()
-    for p in found:
-        p2 = p.strip().rstrip(".")
-        if p2 and p2 not in seen:
-            out.append(p2)
-            seen.add(p2)
-    return out
+    return list(_required_workspace_paths(user_input))
 
 
+@lru_cache(maxsize=64)
 def prompt_requests_patch(user_input: str) -> bool:
-    s = user_input.lower()
-    return (
-        "improvements.patch" in s
-        or "unified diff" in s
-        or "git style" in s
-        or ("create workspace/" in s and ".patch" in s)
-    )
+    return bool(_PATCH_PROMPT_RE.search(user_input) or _CREATE_WS_PATCH_RE.match(user_input))
 
 
-def patch_touched_files(patch_text: str) -> List[str]:
-    out: list[str] = []
-    seen: set[str] = set()
-    for m in _DIFF_FILE_RE.finditer(patch_text):
-        a = m.group(1).strip()
-        if a and a != "/dev/null" and a not in seen:
-            out.append(a)
-            seen.add(a)
-    return out
+_HEADER_PREFIXES = ("diff --git ", "index ", "--- ", "+++ ", "@@")
+_DIFF_LINE_RE = re.compile(r"diff --git a/(.+?) b/(.+?)$")
 
 
-def patch_has_substantive_changes(patch_text: str) -> bool:
+@dataclass(frozen=True)
+class PatchInfo:
+    touched_files: List[str]
+    has_substantive: bool
+    touches_tracked: bool
+
+
+def parse_patch(patch_text: str, tracked_files: Set[str] | frozenset[str] = frozenset()) -> PatchInfo:
+    """
+    Single pass over the patch text that answers all three contract questions:
+    touched files (a/ side of each diff header), whether any +/- line has
+    non-whitespace content, and whether any header path is git-tracked.
+    """
+    touched: list[str] = []
+    seen: set[str] = set()
+    substantive = False
+    touches_tracked = False
+
     for ln in patch_text.splitlines():
-        if ln.startswith(("diff --git ", "index ", "--- ", "+++ ", "@@")):
+        if ln.startswith("diff --git "):
+            m = _DIFF_LINE_RE.match(ln)
+            if m:
+                a = m.group(1).strip()
+                if a and a != "/dev/null" and a not in seen:
+                    touched.append(a)
+                    seen.add(a)
+            if not touches_tracked and tracked_files:
+                parts = ln.split()
+                if len(parts) >= 4:
+                    a_path = parts[2].removeprefix("a/").strip()
+                    b_path = parts[3].removeprefix("b/").strip()
+                    touches_tracked = a_path in tracked_files or b_path in tracked_files
+            continue
+        if substantive or ln.startswith(_HEADER_PREFIXES):
             continue
-        if ln.startswith(("+", "-")):
-            if ln[1:].strip():
-                return True
-    return False
+        if ln.startswith(("+", "-")) and ln[1:].strip():
+            substantive = True
+
+    return PatchInfo(touched_files=touched, has_substantive=substantive, touches_tracked=touches_tracked)
+
+
+def patch_touched_files(patch_text: str) -> List[str]:
+    return parse_patch(patch_text).touched_files
+
+
+def patch_has_substantive_changes(patch_text: str) -> bool:
+    return parse_patch(patch_text).has_substantive
 
 
 def patch_touches_tracked_files(patch_text: str, tracked_files: Set[str]) -> bool:
-    for line in patch_text.splitlines():
-        if line.startswith("diff --git "):
-            parts = line.split()
-            if len(parts) >= 4:
-                a_path = parts[2].removeprefix("a/").strip()
-                b_path = parts[3].removeprefix("b/").strip()
-                if a_path in tracked_files or b_path in tracked_files:
-                    return True
-    return False
+    return parse_patch(patch_text, tracked_files).touches_tracked
+
+
+def _cache_put(key: Any, value: Any) -> Any:
+    if len(_VALIDATION_CACHE) >= _VALIDATION_CACHE_MAX:
+        _VALIDATION_CACHE.clear()
+    _VALIDATION_CACHE[key] = value
+    return value
+
+
+def _tracked_files(paths: RepoPaths) -> Tuple[Any, Set[str]]:
+    """
+    `set(git ls-files)` cached by the git index mtime (the index changes whenever
+    the tracked set does). Returns (cache key, tracked set).
+    """
+    try:
+        st = (paths.repo_root / ".git" / "index").stat()
+        key = ("tracked", paths.repo_root, st.st_mtime_ns, st.st_size)
+    except OSError:
+        # No plain .git/index (e.g. worktree / no repo): don't cache.
+        return None, set(git_ls_files(paths))
+
+    hit = _VALIDATION_CACHE.get(key)
+    if hit is None:
+        hit = _cache_put(key, frozenset(git_ls_files(paths)))
+    return key, hit
+
+
+def _analyze_patch(patch_abs: Path, tracked_key: Any, tracked: Set[str]) -> Tuple[bool, bool, List[str]]:
+    """
+    (touches_tracked, has_substantive_changes, touched_files) for a patch file,
+    cached by the file's (mtime_ns, size) and the tracked-set key.
+    """
+    st = patch_abs.stat()
+    key = ("patch", str(patch_abs), st.st_mtime_ns, st.st_size, tracked_key) if tracked_key is not None else None
+    if key is not None:
+        hit = _VALIDATION_CACHE.get(key)
+        if hit is not None:
+            return hit
+
+    info = parse_patch(patch_abs.read_text(encoding="utf-8", errors="replace"), tracked)
+    result = (info.touches_tracked, info.has_substantive, info.touched_files)
+    return _cache_put(key, result) if key is not None else result
 
 
 def check_improvements_md_grounding(paths: RepoPaths, md_abs: Path, touched_files: List[str]) -> List[str]:
@@ -85,9 +155,15 @@ def check_improvements_md_grounding(paths: RepoPaths, md_abs: Path, touched_file
     if "```" not in md:
         fails.append("IMPROVEMENTS.md must include at least one fenced code block with an excerpt.")
 
-    for fp in touched_files:
-        if fp not in md:
-            fails.append(f"IMPROVEMENTS.md must mention touched file path: {fp}")
+    if touched_files:
+        # One alternation scan finds every mentioned path; longest-first so a path that
+        # prefixes another doesn't shadow it. Paths missed by that pass (e.g. one nested
+        # inside a longer match) get the exact substring check as a fallback.
+        pat = re.compile("|".join(re.escape(fp) for fp in sorted(set(touched_files), key=len, reverse=True)))
+        found = {m.group(0) for m in pat.finditer(md)}
+        for fp in touched_files:
+            if fp not in found and fp not in md:
+                fails.append(f"IMPROVEMENTS.md must mention touched file path: {fp}")
 
     return fails
 
@@ -96,10 +172,11 @@ def validate_task_contract(
     paths: RepoPaths,
     user_input: str,
     baseline_dirty_outside_ws: Set[str] | None = None,
+    arena: ValidationArena | None = None,
 ) -> Tuple[List[str], Set[str]]:
     failures: list[str] = []
 
-    required = extract_required_workspace_paths(user_input)
+    required = _required_workspace_paths(user_input)
     for rel in required:
         p = paths.abs_repo_path(rel)
         if not p.exists():
@@ -125,23 +202,22 @@ def validate_task_contract(
         if not patch_abs.exists():
             failures.append(f"Patch file not created: {patch_rel}")
         else:
-            txt = patch_abs.read_text(encoding="utf-8", errors="replace")
-            tracked = set(git_ls_files(paths))
+            tracked_key, tracked = _tracked_files(paths)
+            touches_tracked, substantive, touched = _analyze_patch(patch_abs, tracked_key, tracked)
 
-            if tracked and not patch_touches_tracked_files(txt, tracked):
+            if tracked and not touches_tracked:
                 failures.append(
                     "Patch does not touch any existing git-tracked files (likely hallucinated / irrelevant). "
                     f"Regenerate {patch_rel} to modify real files from git ls-files."
                 )
 
-            if not patch_has_substantive_changes(txt):
+            if not substantive:
                 failures.append("Patch contains no substantive (+/-) changes (looks whitespace-only or metadata-only).")
 
-            ok, detail = check_patch_in_clean_worktree(paths, patch_abs)
+            ok, detail = check_patch_in_clean_worktree(paths, patch_abs, arena)
             if not ok:
                 failures.append("Patch failed clean-worktree verification:\n" + detail)
 
-            touched = patch_touched_files(txt)
             md_paths = [p for p in required if p.lower().endswith(".md")]
             md_rel = md_paths[0] if md_paths else "workspace/IMPROVEMENTS.md"
             md_abs = paths.abs_repo_path(md_rel)
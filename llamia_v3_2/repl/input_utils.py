@@ -10,7 +10,8 @@ def read_user_input_block(prompt: str = "you> ", paste_drain_s: float = 0.02) ->
 
     Behavior:
       - reads the first line via `input(prompt)`
-      - then drains any immediately-buffered lines that arrive within `paste_drain_s`
+      - then drains any immediately-buffered lines that arrive within `paste_drain_s`,
+        reading stdin in large nonblocking chunks rather than line by line
 
     Notes:
       - On some platforms (notably Windows), select() on sys.stdin can be unreliable.
@@ -30,14 +31,48 @@ def read_user_input_block(prompt: str = "you> ", paste_drain_s: float = 0.02) ->
     try:
         import select  # local import: not always available/usable
 
-        while True:
-            r, _, _ = select.select([sys.stdin], [], [], paste_drain_s)
-            if not r:
-                break
-            nxt = sys.stdin.readline()
-            if not nxt:
-                break
-            lines.append(nxt.rstrip("\n"))
+        fcntl = None
+        if sys.stdin.isatty():
+            # Only on a tty: for pipes input() may already hold later lines in
+            # sys.stdin's own buffer, which raw fd reads would skip.
+            try:
+                import fcntl
+                import os
+            except ImportError:
+                fcntl = None
+
+        if fcntl is None:
+            while True:
+                r, _, _ = select.select([sys.stdin], [], [], paste_drain_s)
+                if not r:
+                    break
+                nxt = sys.stdin.readline()
+                if not nxt:
+                    break
+                lines.append(nxt.rstrip("\n"))
+        else:
+            # Pull the whole buffered paste in 64 KiB reads instead of one select + readline per line.
+            fd = sys.stdin.fileno()
+            fl = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, fl | os.O_NONBLOCK)
+            chunks: list[bytes] = []
+            try:
+                while True:
+                    r, _, _ = select.select([fd], [], [], paste_drain_s)
+                    if not r:
+                        break
+                    try:
+                        chunk = os.read(fd, 65536)
+                    except BlockingIOError:
+                        break
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            finally:
+                fcntl.fcntl(fd, fcntl.F_SETFL, fl)
+            if chunks:
+                text = b"".join(chunks).decode(sys.stdin.encoding or "utf-8", errors="replace")
+                lines.extend(text.rstrip("\n").split("\n"))
     except Exception:
         pass
 
@@ -4,19 +4,41 @@ from dataclasses import asdict, is_dataclass
 from datetime import datetime
 import json
 import logging
+import os
 from pathlib import Path
 import sys
-from typing import Any, Tuple
+import time
+from typing import Any, Callable, Tuple, Union
 
 from .paths import RepoPaths
 
 
+# None of our formatters use thread/process fields; skip resolving them for every record.
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+# A record, or a zero-arg callable that builds it only once the write is known to happen.
+Record = Union[dict[str, Any], Callable[[], dict[str, Any]]]
+
+
 def safe_to_json(obj: Any) -> Any:
     """
     Convert arbitrary objects into something JSON-serializable for JSONL logging.
 
     We prefer not to crash the REPL due to a logging failure.
     """
+    # Exact-type fast paths for the common shapes before the isinstance/dataclass ladder.
+    t = type(obj)
+    if t in _SCALAR_TYPES:
+        return obj
+    if t is dict:
+        return {str(k): safe_to_json(v) for k, v in obj.items()}
+    if t is list:
+        return [safe_to_json(x) for x in obj]
+
     try:
         if is_dataclass(obj):
             return asdict(obj)
@@ -35,6 +57,32 @@ def safe_to_json(obj: Any) -> Any:
     return str(obj)
 
 
+def _json_default(obj: Any) -> Any:
+    # Called by the encoder only for values it cannot serialize natively.
+    try:
+        if is_dataclass(obj) and not isinstance(obj, type):
+            return asdict(obj)
+    except Exception:
+        pass
+    return str(obj)
+
+
+# One reusable encoder: no per-record JSONEncoder construction or kwarg parsing.
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def _encode_record(record: dict[str, Any]) -> str:
+    """
+    Encode one JSONL record. Pure-JSON subtrees are serialized directly; the
+    full safe_to_json walk only runs if the encoder rejects the record (e.g.
+    non-scalar dict keys).
+    """
+    try:
+        return _ENCODER.encode(record)
+    except (TypeError, ValueError):
+        return _ENCODER.encode(safe_to_json(record))
+
+
 def setup_run_logger(paths: RepoPaths) -> Tuple[logging.Logger, Path, Path]:
     """
     Creates:
@@ -53,15 +101,18 @@ def setup_run_logger(paths: RepoPaths) -> Tuple[logging.Logger, Path, Path]:
     logger = logging.getLogger("llamia")
     logger.setLevel(logging.DEBUG)
     logger.handlers.clear()
+    logger.propagate = False
 
+    # Text log lines carry ms since start (no strftime per record); the wall-clock
+    # start is the file name stamp and every JSONL record has its own "ts".
     fh = logging.FileHandler(text_path, encoding="utf-8")
     fh.setLevel(logging.DEBUG)
-    fh.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    fh.setFormatter(logging.Formatter("%(relativeCreated)07d %(levelname).1s %(message)s"))
     logger.addHandler(fh)
 
     ch = logging.StreamHandler(sys.stderr)
     ch.setLevel(logging.WARNING)
-    ch.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    ch.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
     logger.addHandler(ch)
 
     print(f"[log] text:  {text_path}")
@@ -70,16 +121,77 @@ def setup_run_logger(paths: RepoPaths) -> Tuple[logging.Logger, Path, Path]:
     return logger, text_path, jsonl_path
 
 
-def append_jsonl(jsonl_path: Path, record: dict[str, Any]) -> None:
+def append_jsonl(jsonl_path: Path, record: Record) -> None:
     """
     Append one JSON object per line (JSONL).
 
-    The record is run through `safe_to_json` to reduce logging-related crashes.
+    Non-JSON values are converted (dataclasses via asdict, the rest via str) to
+    reduce logging-related crashes. `record` may be a callable returning the dict.
     """
-    record2 = safe_to_json(record)
+    line = _encode_record(record() if callable(record) else record)
     jsonl_path.parent.mkdir(parents=True, exist_ok=True)
     with jsonl_path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(record2, ensure_ascii=False) + "\n")
+        f.write(line + "\n")
+
+
+class JsonlWriter:
+    """
+    Keeps the run's JSONL log open for the whole session.
+
+    On POSIX the log is an O_APPEND file descriptor and every record is encoded
+    once and written with a single os.write, so lines from concurrent REPLs
+    sharing a log can't interleave and there is no Python-level buffer to
+    flush. On Windows, where O_APPEND semantics differ, it falls back to a text
+    file with a large write buffer; call `flush()` at turn boundaries to bound
+    what a crash can lose there.
+    Records without a "ts" field are stamped with wall-clock time on append.
+    Heavy records can be passed as a callable; it is only invoked while the
+    writer is open, so records appended after close() are dropped unbuilt.
+    """
+
+    def __init__(self, jsonl_path: Path, buffering: int = 1 << 16) -> None:
+        jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = jsonl_path
+        self._fd: int | None = None
+        self._f = None
+        if os.name == "posix":
+            self._fd = os.open(jsonl_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        else:
+            self._f = jsonl_path.open("a", encoding="utf-8", buffering=buffering)
+
+    def append(self, record: Record) -> None:
+        if self._fd is None and (self._f is None or self._f.closed):
+            return
+        if callable(record):
+            record = record()
+        if "ts" not in record:
+            record["ts"] = time.time()
+        line = _encode_record(record) + "\n"
+        if self._fd is None:
+            self._f.write(line)
+            return
+        data = line.encode("utf-8")
+        n = os.write(self._fd, data)
+        while n < len(data):  # regular files write fully in practice; be safe anyway
+            data = data[n:]
+            n = os.write(self._fd, data)
+
+    def flush(self) -> None:
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        elif self._f is not None and not self._f.closed:
+            self._f.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
 
 
 def tail_lines(s: str, max_chars: int = 4000) -> str:
@@ -92,17 +204,31 @@ def tail_lines(s: str, max_chars: int = 4000) -> str:
     return s2[:max_chars] + "\n...[truncated]"
 
 
+_READ_CACHE: dict[tuple[Path, int], tuple[int, int, str]] = {}
+
+
 def read_if_exists(paths: RepoPaths, rel_path: str, max_chars: int = 8000) -> str | None:
     """
     Best-effort read helper used in snapshots. Returns:
       - None if file does not exist
       - truncated text if it exists
       - an error string if the read fails
+
+    Results are cached by (mtime_ns, size), so repeated snapshots across retry
+    attempts only re-read a file after it actually changed.
     """
     p = paths.abs_repo_path(rel_path)
-    if not p.exists():
+    try:
+        st = p.stat()
+    except OSError:
         return None
+    key = (p, max_chars)
+    hit = _READ_CACHE.get(key)
+    if hit is not None and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
     try:
-        return tail_lines(p.read_text(encoding="utf-8", errors="replace"), max_chars=max_chars)
+        text = tail_lines(p.read_text(encoding="utf-8", errors="replace"), max_chars=max_chars)
     except Exception as e:
         return f"[read_error] {e!r}"
+    _READ_CACHE[key] = (st.st_mtime_ns, st.st_size, text)
+    return text
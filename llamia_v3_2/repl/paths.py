@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import os
 from pathlib import Path
 from typing import Union
 
@@ -17,6 +18,10 @@ class RepoPaths:
 
     repo_root: Path
     workspace_dir: Path
+    _repo_root_prefix: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_repo_root_prefix", os.path.join(str(self.repo_root), ""))
 
     @classmethod
     def from_entrypoint(cls, entry_file: Path) -> "RepoPaths":
@@ -31,5 +36,8 @@ class RepoPaths:
         Convert a repo-relative path like 'workspace/IMPROVEMENTS.md' into an absolute Path.
         Absolute inputs are returned unchanged.
         """
-        path = Path(p)
-        return path if path.is_absolute() else (self.repo_root / path)
+        if isinstance(p, str):
+            # Hot path (snapshots, log reads, contract checks): one Path build from a
+            # joined string instead of Path(p) + is_absolute() + the / operator.
+            return Path(p) if os.path.isabs(p) else Path(self._repo_root_prefix + p)
+        return p if p.is_absolute() else (self.repo_root / p)
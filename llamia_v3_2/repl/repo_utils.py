@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import atexit
+from collections import deque
 from pathlib import Path
+import os
+import re
 import shutil
 import subprocess
-import sys
 import tempfile
-from typing import List, Set, Tuple
+import time
+import traceback
+from itertools import islice
+from typing import Dict, Generator, Iterable, List, Set, Tuple
 
 from .paths import RepoPaths
 
@@ -28,18 +34,93 @@ def run_git(paths: RepoPaths, args: List[str]) -> Tuple[int, str, str]:
         return 127, "", "git not found"
 
 
-def git_ls_files(paths: RepoPaths) -> List[str]:
-    rc, out, _ = run_git(paths, ["ls-files"])
-    if rc != 0:
-        return []
-    return [ln.strip() for ln in out.splitlines() if ln.strip()]
+def _index_stamp(paths: RepoPaths) -> Tuple[int, int] | None:
+    """(mtime_ns, size) of .git/index, or None when there is no plain index file."""
+    try:
+        st = (paths.repo_root / ".git" / "index").stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+# ls-files only changes when the index does; status also sees the worktree, so it
+# is only reused for a short window (rapid back-to-back checks within one step).
+_LS_FILES_CACHE: Dict[Path, Tuple[Tuple[int, int], List[str]]] = {}
+_STATUS_CACHE: Dict[Path, Tuple[Tuple[int, int], float, List[str]]] = {}
+STATUS_TTL_S = 0.5
+
+
+def _stream_ls_files(paths: RepoPaths) -> Generator[str, None, None]:
+    """
+    Yield `git ls-files -z` entries as they are read, in git's (sorted) order.
+
+    Closing the generator early terminates git, so callers that only need a
+    prefix never read or split the rest of a large listing.
+    """
+    try:
+        proc = subprocess.Popen(
+            ["git", "ls-files", "-z"],
+            cwd=str(paths.repo_root),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        return
+    assert proc.stdout is not None
+    try:
+        tail = b""
+        while True:
+            chunk = proc.stdout.read1(1 << 16)
+            if not chunk:
+                break
+            parts = (tail + chunk).split(b"\0")
+            tail = parts.pop()
+            for raw in parts:
+                if raw:
+                    yield raw.decode("utf-8", "surrogateescape")
+        if tail:
+            yield tail.decode("utf-8", "surrogateescape")
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+        proc.stdout.close()
+        proc.wait()
+
+
+def git_ls_files(paths: RepoPaths, limit: int | None = None) -> List[str]:
+    """
+    Tracked files (cached by index stamp). With `limit`, a cache miss streams
+    only the first `limit` entries instead of listing the whole repo.
+    """
+    stamp = _index_stamp(paths)
+    hit = _LS_FILES_CACHE.get(paths.repo_root)
+    if stamp is not None and hit is not None and hit[0] == stamp:
+        return hit[1][:limit] if limit is not None else list(hit[1])
+
+    if limit is not None:
+        return list(islice(_stream_ls_files(paths), limit))
+
+    # Same -z listing as the limit path: raw names, no C-quoting, no stripping.
+    files = list(_stream_ls_files(paths))
+    if stamp is not None and files:  # empty also covers git failing; don't pin that
+        _LS_FILES_CACHE[paths.repo_root] = (stamp, files)
+    return list(files)
 
 
 def git_status_porcelain(paths: RepoPaths) -> List[str]:
+    stamp = _index_stamp(paths)
+    now = time.monotonic()
+    hit = _STATUS_CACHE.get(paths.repo_root)
+    if stamp is not None and hit is not None and hit[0] == stamp and now - hit[1] < STATUS_TTL_S:
+        return list(hit[2])
+
     rc, out, _ = run_git(paths, ["status", "--porcelain"])
     if rc != 0:
         return []
-    return [ln.rstrip("\n") for ln in out.splitlines() if ln.strip()]
+    lines = [ln.rstrip("\n") for ln in out.splitlines() if ln.strip()]
+    if stamp is not None:
+        _STATUS_CACHE[paths.repo_root] = (stamp, now, lines)
+    return list(lines)
 
 
 def porcelain_paths(lines: List[str]) -> Set[str]:
@@ -66,11 +147,23 @@ def porcelain_paths(lines: List[str]) -> Set[str]:
 def dirty_outside_workspace(paths: RepoPaths) -> Set[str]:
     """
     Returns modified/added/deleted tracked file paths excluding workspace/.
+
+    One `git diff --name-only HEAD` with workspace/ excluded by pathspec answers
+    this directly; the full status + porcelain parse is only the fallback for a
+    repo without a HEAD commit yet.
     """
+    rc, out, _ = run_git(
+        paths, ["diff", "--name-only", "--no-renames", "-z", "HEAD", "--", ".", ":(exclude)workspace"]
+    )
+    if rc == 0:
+        return {p for p in out.split("\0") if p}
     changed = porcelain_paths(git_status_porcelain(paths))
     return {p for p in changed if p and not p.startswith("workspace/")}
 
 
+_RESTORE_SH = 'git restore --staged --worktree -- "$@" || { git reset -q -- "$@"; git checkout -- "$@"; }'
+
+
 def git_restore_paths(paths: RepoPaths, files: Set[str]) -> None:
     """
     Best-effort restore of newly dirtied paths after a failed contract attempt.
@@ -78,11 +171,27 @@ def git_restore_paths(paths: RepoPaths, files: Set[str]) -> None:
     Uses:
       - git restore --staged --worktree
       - fallback: git reset + git checkout
+    On POSIX the chain runs in one `sh -c` instead of up to three git calls from Python.
     """
     if not files:
         return
 
+    _STATUS_CACHE.pop(paths.repo_root, None)
     plist = sorted(files)
+
+    if os.name == "posix":
+        # One shell runs the whole chain; paths go in as "$@", so nothing is re-quoted.
+        try:
+            subprocess.run(
+                ["sh", "-c", _RESTORE_SH, "sh", *plist],
+                cwd=str(paths.repo_root),
+                capture_output=True,
+                check=False,
+            )
+            return
+        except FileNotFoundError:
+            pass
+
     rc, _, _ = run_git(paths, ["restore", "--staged", "--worktree", "--", *plist])
     if rc == 0:
         return
@@ -91,90 +200,272 @@ def git_restore_paths(paths: RepoPaths, files: Set[str]) -> None:
     run_git(paths, ["checkout", "--", *plist])
 
 
+# Snapshot noise (venvs, logs, vector store, caches, binary blobs) as one compiled
+# pattern, so each path costs a single search instead of one check per rule.
+_SNAPSHOT_SKIP_RE = re.compile(
+    r"^(?:\.venv/|workspace/logs/|workspace/\.venv/|\.llamia_chroma/)"
+    r"|/__pycache__(?:/|$)"
+    r"|\.(?:bin|sqlite3|db|pkl|pt|onnx)$"
+)
+
+
+# Directories the non-git fallback walk never descends into (relative paths).
+_WALK_SKIP_DIRS = frozenset({".git", ".venv", ".llamia_chroma", "workspace/logs", "workspace/.venv"})
+_WALK_SKIP_NAMES = frozenset({"__pycache__", "node_modules"})
+
+
+def _scandir_walk(root: Path, limit: int) -> List[str]:
+    """
+    Breadth-first os.scandir walk returning up to `limit` repo-relative file paths
+    ('/'-separated). Skipped directories are pruned at the entry, so venvs and
+    vector stores are never listed.
+    """
+    out: list[str] = []
+    queue: deque[tuple[str, str]] = deque([(str(root), "")])
+    while queue:
+        d, rel = queue.popleft()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                child = rel + entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    if entry.name not in _WALK_SKIP_NAMES and child not in _WALK_SKIP_DIRS:
+                        queue.append((entry.path, child + "/"))
+                elif entry.is_file():
+                    out.append(child)
+                    if len(out) >= limit:
+                        return out
+    return out
+
+
 def repo_snapshot_text(paths: RepoPaths, max_files: int) -> str:
     """
     Produce a truncated “tree” of repo files to ground the model.
 
-    Prefers `git ls-files` but falls back to rglob if repo isn't a git checkout.
+    Prefers `git ls-files` but falls back to a pruned directory walk if repo isn't a git checkout.
     """
-    files = git_ls_files(paths)
-    if not files:
-        files = []
-        for p in paths.repo_root.rglob("*"):
-            if p.is_file():
-                files.append(str(p.relative_to(paths.repo_root)))
-                if len(files) >= max_files * 3:
-                    break
-
-    skip_prefixes = (
-        ".venv/",
-        "workspace/logs/",
-        "workspace/.venv/",
-        ".llamia_chroma/",
-    )
-    skip_exts = (".bin", ".sqlite3", ".db", ".pkl", ".pt", ".onnx")
+    # ls-files is sorted, so the first max_files entries that survive the filter
+    # are exactly the snapshot; stop reading there (git is terminated on close).
+    stamp = _index_stamp(paths)
+    hit = _LS_FILES_CACHE.get(paths.repo_root)
+    stream: Generator[str, None, None] | None = None
+    if stamp is not None and hit is not None and hit[0] == stamp:
+        entries: Iterable[str] = hit[1]
+    else:
+        entries = stream = _stream_ls_files(paths)
 
     filtered: list[str] = []
-    for s in files:
-        s2 = str(s)
-        if any(s2.startswith(p) for p in skip_prefixes):
-            continue
-        if "/__pycache__/" in s2 or s2.endswith("/__pycache__"):
-            continue
-        if any(s2.endswith(ext) for ext in skip_exts):
-            continue
-        filtered.append(s2)
+    seen_any = False
+    try:
+        for s in entries:
+            seen_any = True
+            if not _SNAPSHOT_SKIP_RE.search(s):
+                filtered.append(s)
+                if len(filtered) >= max_files:
+                    break
+    finally:
+        if stream is not None:
+            stream.close()
+
+    if not seen_any:
+        filtered = [s for s in _scandir_walk(paths.repo_root, max_files * 3) if not _SNAPSHOT_SKIP_RE.search(s)]
 
     files2 = sorted(filtered)[:max_files]
     return "Repo files (truncated):\n" + "\n".join(f"- {f}" for f in files2)
 
 
-def check_patch_in_clean_worktree(paths: RepoPaths, patch_abs: Path) -> tuple[bool, str]:
+_SNAPSHOT_CACHE: dict[tuple[Path, int], tuple[int, str]] = {}
+
+
+def cached_repo_snapshot_text(paths: RepoPaths, max_files: int) -> str:
     """
-    Verify patch applies cleanly to HEAD, then compileall in an isolated worktree.
-    Returns (ok, details).
+    repo_snapshot_text, cached per session by the git index mtime.
+
+    The snapshot is built from `git ls-files`, which only changes when the index
+    does, so task turns after the first skip the ls-files + filter pass unless
+    the tracked tree actually changed. Without a plain .git/index it is never cached.
     """
-    paths.workspace_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        mtime = (paths.repo_root / ".git" / "index").stat().st_mtime_ns
+    except OSError:
+        return repo_snapshot_text(paths, max_files)
 
-    base = Path(tempfile.mkdtemp(prefix="llamia_applycheck_", dir=str(paths.workspace_dir)))
-    wt_dir = base / "wt"  # must NOT exist before `git worktree add`
+    key = (paths.repo_root, max_files)
+    hit = _SNAPSHOT_CACHE.get(key)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
 
-    try:
-        rc, out, err = run_git(paths, ["worktree", "add", "--detach", str(wt_dir), "HEAD"])
-        if rc != 0:
-            return False, f"git worktree add failed:\n{err or out}"
+    text = repo_snapshot_text(paths, max_files)
+    _SNAPSHOT_CACHE[key] = (mtime, text)
+    return text
 
-        p = subprocess.run(
-            ["git", "apply", "--check", str(patch_abs)],
-            cwd=str(wt_dir),
-            capture_output=True,
-            text=True,
-        )
-        if p.returncode != 0:
-            return False, f"git apply --check failed:\n{p.stderr or p.stdout}"
 
-        p2 = subprocess.run(
-            ["git", "apply", str(patch_abs)],
-            cwd=str(wt_dir),
-            capture_output=True,
-            text=True,
-        )
-        if p2.returncode != 0:
-            return False, f"git apply failed in worktree:\n{p2.stderr or p2.stdout}"
+_PRUNE_PENDING: Set[Path] = set()
 
-        p3 = subprocess.run(
-            [sys.executable, "-m", "compileall", "-q", "."],
-            cwd=str(wt_dir),
-            capture_output=True,
-            text=True,
-        )
-        if p3.returncode != 0:
-            return False, f"compileall failed in worktree:\n{p3.stderr or p3.stdout}"
 
-        return True, "ok"
-    finally:
+def flush_worktree_prunes() -> None:
+    """Run one `git worktree prune` per repo that had validation worktrees deleted."""
+    while _PRUNE_PENDING:
+        root = _PRUNE_PENDING.pop()
         try:
-            run_git(paths, ["worktree", "remove", "--force", str(wt_dir)])
+            subprocess.run(["git", "worktree", "prune"], cwd=str(root), capture_output=True, check=False)
         except Exception:
             pass
-        shutil.rmtree(base, ignore_errors=True)
+
+
+def _schedule_worktree_prune(paths: RepoPaths) -> None:
+    if not _PRUNE_PENDING:
+        atexit.unregister(flush_worktree_prunes)
+        atexit.register(flush_worktree_prunes)
+    _PRUNE_PENDING.add(paths.repo_root)
+
+
+def _numstat_paths(out: str) -> List[str]:
+    """
+    Paths from `git apply --numstat -z` output. Each record is
+    "<added> TAB <deleted> TAB <path> NUL"; renames leave the path empty and
+    follow it with "<old> NUL <new> NUL".
+    """
+    fields = out.split("\0")
+    paths: list[str] = []
+    i = 0
+    while i < len(fields):
+        rec = fields[i]
+        i += 1
+        if not rec:
+            continue
+        path = rec.split("\t", 2)[-1]
+        if path:
+            paths.append(path)
+        elif i + 1 < len(fields):
+            paths.append(fields[i + 1])  # rename: keep the new path
+            i += 2
+    return paths
+
+
+def _compile_touched(wt_dir: Path, rel_paths: List[str]) -> List[str]:
+    """
+    Byte-compile the patched .py files in-process (no interpreter startup, no
+    whole-tree walk). HEAD already compiles, so only files the patch touched can
+    introduce errors. Returns compileall-style error messages.
+    """
+    errors: list[str] = []
+    for rel in rel_paths:
+        if not rel.endswith(".py"):
+            continue
+        f = wt_dir / rel
+        try:
+            source = f.read_bytes()
+        except FileNotFoundError:
+            continue  # deleted by the patch
+        try:
+            compile(source, str(f), "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            errors.append(f"*** Error compiling {rel!r}...\n" + "".join(traceback.format_exception_only(type(e), e)))
+    return errors
+
+
+def _run_in(cwd: Path, argv: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(argv, cwd=str(cwd), capture_output=True, text=True)
+
+
+class ValidationArena:
+    """
+    A detached worktree at HEAD reused across serial patch validations.
+
+    The worktree is added on the first check; later checks only reset it
+    (`git reset --hard HEAD` + `git clean -fd`), which is far cheaper than a new
+    `git worktree add`. If the reset fails the worktree is discarded and recreated.
+
+    Use as a context manager (or call close()) to delete the worktree.
+    """
+
+    def __init__(self, paths: RepoPaths) -> None:
+        self.paths = paths
+        self._base: Path | None = None
+        self._wt: Path | None = None
+        self._dirty = False
+
+    def __enter__(self) -> "ValidationArena":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._base is not None:
+            # Deleting the directory is enough; the stale .git/worktrees entry is
+            # cleared by one `git worktree prune` at exit instead of a remove per check.
+            shutil.rmtree(self._base, ignore_errors=True)
+            _schedule_worktree_prune(self.paths)
+        self._base = None
+        self._wt = None
+        self._dirty = False
+
+    def _ready(self) -> tuple[Path | None, str]:
+        """Return a clean worktree at HEAD, or (None, error)."""
+        if self._wt is not None:
+            if not self._dirty:
+                return self._wt, ""
+            if (
+                _run_in(self._wt, ["git", "reset", "-q", "--hard", "HEAD"]).returncode == 0
+                and _run_in(self._wt, ["git", "clean", "-fdq"]).returncode == 0
+            ):
+                self._dirty = False
+                return self._wt, ""
+            self.close()
+
+        self.paths.workspace_dir.mkdir(parents=True, exist_ok=True)
+        self._base = Path(tempfile.mkdtemp(prefix="llamia_applycheck_", dir=str(self.paths.workspace_dir)))
+        wt_dir = self._base / "wt"  # must NOT exist before `git worktree add`
+        rc, out, err = run_git(self.paths, ["worktree", "add", "--detach", str(wt_dir), "HEAD"])
+        if rc != 0:
+            self.close()
+            return None, f"git worktree add failed:\n{err or out}"
+        self._wt = wt_dir
+        return wt_dir, ""
+
+    def check(self, patch_abs: Path) -> tuple[bool, str]:
+        """
+        Verify patch applies cleanly to HEAD, then compileall in the worktree.
+        Returns (ok, details).
+        """
+        wt_dir, err = self._ready()
+        if wt_dir is None:
+            return False, err
+        self._dirty = True
+
+        # `git apply` is all-or-nothing (it checks every hunk before writing), so one
+        # call replaces the separate `--check` pass in this throwaway worktree.
+        # --numstat -z also reports the touched paths for the compile step.
+        p = _run_in(wt_dir, ["git", "apply", "--apply", "--numstat", "-z", str(patch_abs)])
+        if p.returncode != 0:
+            return False, f"git apply failed in worktree:\n{p.stderr or p.stdout}"
+
+        errors = _compile_touched(wt_dir, _numstat_paths(p.stdout))
+        if errors:
+            return False, "compileall failed in worktree:\n" + "\n".join(errors)
+
+        return True, "ok"
+
+
+def check_patch_in_clean_worktree(
+    paths: RepoPaths, patch_abs: Path, arena: ValidationArena | None = None
+) -> tuple[bool, str]:
+    """
+    Verify patch applies cleanly to HEAD, then compileall in an isolated worktree.
+    Returns (ok, details).
+
+    Pass a ValidationArena to reuse its worktree; otherwise a one-off one is used.
+    """
+    if arena is not None:
+        return arena.check(patch_abs)
+    with ValidationArena(paths) as one_off:
+        return one_off.check(patch_abs)
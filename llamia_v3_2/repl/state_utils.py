@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from dataclasses import fields
+from operator import attrgetter
+import sys
 from typing import Any, Dict, List
 
 from llamia_v3_2.state import CodePatch, ExecRequest, ExecResult, LlamiaState, PlanStep
@@ -7,6 +10,22 @@ from llamia_v3_2.state import CodePatch, ExecRequest, ExecResult, LlamiaState, P
 from .logging_utils import tail_lines
 
 
+# Routing fields copied verbatim into every snapshot, fetched in one attrgetter call.
+_SNAPSHOT_FIELDS = (
+    "mode",
+    "goal",
+    "intent_kind",
+    "intent_payload",
+    "intent_source",
+    "next_agent",
+    "loop_count",
+    "web_search_count",
+    "research_query",
+    "trace",
+)
+_get_snapshot_fields = attrgetter(*_SNAPSHOT_FIELDS)
+
+
 def state_snapshot(state: LlamiaState) -> Dict[str, Any]:
     """
     Compact snapshot suitable for JSONL:
@@ -17,42 +36,39 @@ def state_snapshot(state: LlamiaState) -> Dict[str, Any]:
 
     This is intentionally “lossy” to keep logs small and safe.
     """
-    msgs: list[dict[str, Any]] = []
-    for m in (state.messages or [])[-12:]:
-        msgs.append(
-            {
-                "role": m.get("role"),
-                "node": m.get("node"),
-                "content": tail_lines((m.get("content") or "").strip(), max_chars=2000),
-            }
-        )
+    msgs = [
+        {
+            "role": m.get("role"),
+            "node": m.get("node"),
+            "content": tail_lines((m.get("content") or "").strip(), max_chars=2000),
+        }
+        for m in (state.messages or [])[-12:]
+    ]
 
-    last_exec: list[dict[str, Any]] = []
-    for r in (getattr(state, "last_exec_results", None) or [])[-6:]:
-        last_exec.append(
-            {
-                "command": r.command,
-                "returncode": r.returncode,
-                "stdout_tail": tail_lines((r.stdout or "").strip(), max_chars=1500),
-                "stderr_tail": tail_lines((r.stderr or "").strip(), max_chars=1500),
-            }
-        )
+    last_exec = [
+        {
+            "command": r.command,
+            "returncode": r.returncode,
+            "stdout_tail": tail_lines((r.stdout or "").strip(), max_chars=1500),
+            "stderr_tail": tail_lines((r.stderr or "").strip(), max_chars=1500),
+        }
+        for r in (state.last_exec_results or [])[-6:]
+    ]
 
-    return {
-        "mode": getattr(state, "mode", None),
-        "goal": getattr(state, "goal", None),
-        "intent_kind": getattr(state, "intent_kind", None),
-        "intent_payload": getattr(state, "intent_payload", None),
-        "intent_source": getattr(state, "intent_source", None),
-        "next_agent": getattr(state, "next_agent", None),
-        "loop_count": getattr(state, "loop_count", None),
-        "web_search_count": getattr(state, "web_search_count", None),
-        "research_query": getattr(state, "research_query", None),
-        "trace": getattr(state, "trace", None),
-        "messages_tail": msgs,
-        "exec_request": getattr(state, "exec_request", None),
-        "last_exec_results_tail": last_exec,
-    }
+    snap: Dict[str, Any] = dict(zip(_SNAPSHOT_FIELDS, _get_snapshot_fields(state)))
+    snap["messages_tail"] = msgs
+    snap["exec_request"] = state.exec_request
+    snap["last_exec_results_tail"] = last_exec
+    return snap
+
+
+def _intern(value: Any) -> Any:
+    """
+    Intern routing labels (mode/intent/next_agent). Literals in node code are already
+    interned by the compiler; this makes values rebuilt from raw dicts identical objects
+    too, so the hot `state.mode == "task"` style comparisons hit the identity fast path.
+    """
+    return sys.intern(value) if type(value) is str else value
 
 
 def make_exec_results(raw_list: Any) -> List[ExecResult]:
@@ -80,6 +96,52 @@ def make_exec_results(raw_list: Any) -> List[ExecResult]:
     return results
 
 
+_LLAMIA_FIELDS = frozenset(f.name for f in fields(LlamiaState))
+_INTERNED_FIELDS = ("mode", "next_agent", "return_after_web", "return_after_research", "intent_kind", "intent_source")
+_LIST_ITEM_TYPES = (
+    ("plan", PlanStep),
+    ("pending_patches", CodePatch),
+    ("applied_patches", CodePatch),
+    ("exec_results", ExecResult),
+    ("last_exec_results", ExecResult),
+    ("messages", dict),
+)
+_INT_FIELDS = ("turn_id", "responded_turn_id", "loop_count", "web_search_count")
+
+
+def _is_well_typed(raw: dict[str, Any]) -> bool:
+    """True if `raw` already has the shapes the slow path would build."""
+    for name, item_type in _LIST_ITEM_TYPES:
+        v = raw.get(name, ())
+        if type(v) is not list and v != ():
+            return False
+        for x in v:
+            if not isinstance(x, item_type):
+                return False
+    for name in _INT_FIELDS:
+        if type(raw.get(name, 0)) is not int:
+            return False
+    if raw.get("responded_turn_id") == 0:
+        return False  # the slow path maps 0 to -1
+    luid = raw.get("last_user_idx")
+    if luid is not None and type(luid) is not int:
+        return False
+    queue = raw.get("web_queue", ())
+    if type(queue) is not list and queue != ():
+        return False
+    for q in queue:
+        if type(q) is not str or not q or q != q.strip():
+            return False
+    req = raw.get("exec_request")
+    if req is not None and not isinstance(req, ExecRequest):
+        return False
+    for name in ("return_after_web", "return_after_research"):
+        v = raw.get(name, "planner")
+        if type(v) is not str or not v or v != v.strip():
+            return False
+    return True
+
+
 def coerce_to_state(raw: Any) -> LlamiaState:
     """
     LangGraph nodes can accidentally return plain dicts.
@@ -90,6 +152,14 @@ def coerce_to_state(raw: Any) -> LlamiaState:
     if isinstance(raw, LlamiaState):
         return raw
 
+    if isinstance(raw, dict) and _is_well_typed(raw):
+        # LangGraph hands back the channel values nodes set on a real LlamiaState,
+        # so the usual case needs no per-item rebuild.
+        state = LlamiaState(**{k: v for k, v in raw.items() if k in _LLAMIA_FIELDS})
+        for name in _INTERNED_FIELDS:
+            setattr(state, name, _intern(getattr(state, name)))
+        return state
+
     if isinstance(raw, dict):
         raw_plan = raw.get("plan") or []
         plan: list[PlanStep] = []
@@ -151,34 +221,40 @@ def coerce_to_state(raw: Any) -> LlamiaState:
         return_after_web = str(raw.get("return_after_web", "planner") or "planner").strip() or "planner"
         return_after_research = str(raw.get("return_after_research", "planner") or "planner").strip() or "planner"
 
+        raw_last_user_idx = raw.get("last_user_idx")
+        last_user_idx = raw_last_user_idx if isinstance(raw_last_user_idx, int) else None
+
         turn_id = int(raw.get("turn_id", 0) or 0)
         responded_turn_id = int(raw.get("responded_turn_id", -1) or -1)
 
         return LlamiaState(
             messages=raw.get("messages", []),
-            mode=raw.get("mode", "chat"),
+            last_user_idx=last_user_idx,
+            mode=_intern(raw.get("mode", "chat")),
             goal=raw.get("goal"),
             plan=plan,
+            plan_fingerprint=raw.get("plan_fingerprint") if isinstance(raw.get("plan_fingerprint"), str) else None,
             pending_patches=pending_patches,
             applied_patches=applied_patches,
             exec_request=exec_req,
             exec_results=exec_results,
             last_exec_results=last_exec_results,
-            next_agent=raw.get("next_agent"),
+            next_agent=_intern(raw.get("next_agent")),
             trace=raw.get("trace", []),
             research_query=raw.get("research_query"),
             research_notes=raw.get("research_notes"),
             fix_instructions=raw.get("fix_instructions"),
             loop_count=int(raw.get("loop_count", 0) or 0),
             expected_failure=bool(raw.get("expected_failure", False)),
+            retry_count=int(raw.get("retry_count", 0) or 0),
             web_queue=web_queue,
             web_results=raw.get("web_results"),
-            return_after_web=return_after_web,
-            return_after_research=return_after_research,
+            return_after_web=_intern(return_after_web),
+            return_after_research=_intern(return_after_research),
             web_search_count=int(raw.get("web_search_count", 0) or 0),
-            intent_kind=raw.get("intent_kind"),
+            intent_kind=_intern(raw.get("intent_kind")),
             intent_payload=raw.get("intent_payload"),
-            intent_source=raw.get("intent_source"),
+            intent_source=_intern(raw.get("intent_source")),
             turn_id=turn_id,
             responded_turn_id=responded_turn_id,
         )
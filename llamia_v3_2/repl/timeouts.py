@@ -1,44 +1,57 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
-import signal
-from typing import Iterator, Optional
+import threading
+from typing import Any, Callable, TypeVar
 
+from llamia_v3_2.state import CancelToken
 
-class InvokeTimeout(Exception):
-    """Raised when a single graph invocation exceeds the configured wall-clock timeout."""
+T = TypeVar("T")
 
 
-def _alarm_handler(_signum: int, _frame: Optional[object]) -> None:
-    raise InvokeTimeout("invoke exceeded timeout")
+class InvokeTimeout(Exception):
+    """Raised when a single graph invocation exceeds the configured wall-clock timeout."""
 
 
-def _set_alarm(seconds: int) -> None:
-    """
-    Enable SIGALRM-based timeout on platforms that support it (Linux/macOS).
-    No-op on Windows.
+def call_with_timeout(
+    fn: Callable[..., T],
+    seconds: int,
+    *args: Any,
+    cancel_token: CancelToken | None = None,
+    **kwargs: Any,
+) -> T:
     """
-    if hasattr(signal, "SIGALRM"):
-        signal.signal(signal.SIGALRM, _alarm_handler)
-        signal.alarm(max(1, int(seconds)))
+    Run `fn(*args, **kwargs)` on a worker thread and wait at most `seconds` for it.
 
+    No SIGALRM is involved, so it works on Windows and does not touch signal
+    handlers. The main thread only waits on an Event, so Ctrl+C still raises
+    KeyboardInterrupt there.
 
-def _clear_alarm() -> None:
-    if hasattr(signal, "SIGALRM"):
-        signal.alarm(0)
-
-
-@contextmanager
-def invoke_timeout(seconds: int) -> Iterator[None]:
-    """
-    Context manager used around `app.invoke(...)`.
-
-    Example:
-        with invoke_timeout(600):
-            result = app.invoke(state, config={...})
+    On timeout (or interrupt) the worker cannot be killed; it is a daemon thread,
+    so an abandoned invocation never blocks exit. If `cancel_token` is given it is
+    cancelled then, and the graph stops the abandoned run at its next node.
     """
-    _set_alarm(seconds)
+    done = threading.Event()
+    box: dict[str, Any] = {}
+
+    def _run() -> None:
+        try:
+            box["result"] = fn(*args, **kwargs)
+        except BaseException as e:  # re-raised on the caller's thread
+            box["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=_run, name="llamia-invoke", daemon=True).start()
     try:
-        yield
-    finally:
-        _clear_alarm()
+        finished = done.wait(max(1, int(seconds)))
+    except BaseException:
+        if cancel_token is not None:
+            cancel_token.cancel()
+        raise
+    if not finished:
+        if cancel_token is not None:
+            cancel_token.cancel()
+        raise InvokeTimeout("invoke exceeded timeout")
+    if "error" in box:
+        raise box["error"]
+    return box["result"]
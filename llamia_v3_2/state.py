@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
 from typing import Literal, TypedDict
 
+from .config import DEFAULT_CONFIG
+
 
 class Message(TypedDict):
     role: Literal["user", "assistant", "system"]
@@ -29,27 +32,27 @@ Important Notes:
 
 
 
-@dataclass
+@dataclass(slots=True)
 class PlanStep:
     id: int
     description: str
     status: Literal["pending", "in_progress", "done", "skipped", "failed"] = "pending"
 
 
-@dataclass
+@dataclass(slots=True)
 class CodePatch:
     file_path: str  # e.g. "hello.py" (relative to workspace/)
     content: str  # full file contents
     apply_mode: Literal["overwrite", "append"] = "overwrite"
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecRequest:
     workdir: str  # e.g. "workspace"
     commands: list[str]  # e.g. ["python hello.py"]
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecResult:
     command: str
     returncode: int
@@ -57,7 +60,30 @@ class ExecResult:
     stderr: str
 
 
-@dataclass
+class CancelToken:
+    """
+    Cooperative cancellation flag for one graph invocation.
+
+    The REPL passes it in the run config (config["configurable"]["cancel_token"]),
+    never in the graph state, and sets it when it stops waiting (timeout / Ctrl+C).
+    The graph checks it at every node boundary, so an abandoned run stops at the
+    next node instead of issuing further LLM calls in the background.
+    """
+
+    __slots__ = ("cancelled",)
+
+    def __init__(self) -> None:
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class InvocationCancelled(RuntimeError):
+    """Raised at a node boundary once the invocation's CancelToken was cancelled."""
+
+
+@dataclass(slots=True)
 class LlamiaState:
     """
     Central state container for Llamia agent workflow
@@ -83,6 +109,8 @@ class LlamiaState:
     """
     messages: list[Message] = field(default_factory=list)
 
+    # Index of the most recent user message in `messages` (kept by add_message)
+    last_user_idx: int | None = None
 
     turn_id: int = 0
     responded_turn_id: int = -1
@@ -101,6 +129,9 @@ class LlamiaState:
     # Task plan
     plan: list[PlanStep] = field(default_factory=list)
 
+    # Fingerprint (planner cache key) of the goal + research notes that produced `plan`
+    plan_fingerprint: str | None = None
+
     # Code patches
     pending_patches: list[CodePatch] = field(default_factory=list)
     applied_patches: list[CodePatch] = field(default_factory=list)
@@ -138,6 +169,9 @@ class LlamiaState:
     # If task is intentionally demonstrating a failure (don’t “auto-fix”)
     expected_failure: bool = False
 
+    # Transient exec-failure retries (failure_handler)
+    retry_count: int = 0
+
     # Debugging trace
     trace: list[str] = field(default_factory=list)
 
@@ -147,10 +181,37 @@ class LlamiaState:
         content: str,
         node: str | None = None,
     ) -> None:
-        self.messages.append({"role": role, "content": content, "node": node})
-
-    def log(self, text: str) -> None:
-        self.trace.append(text)
+        # role/node come from tiny fixed sets; interning makes every message share
+        # one str object per value, so later comparisons are mostly identity hits.
+        self.messages.append(
+            {"role": sys.intern(role), "content": content, "node": sys.intern(node) if node else node}
+        )
+        if role == "user":
+            self.last_user_idx = len(self.messages) - 1
+
+    def latest_user_text(self) -> str:
+        """
+        Stripped content of the most recent user message ("" if none).
+        O(1) via last_user_idx; falls back to a reverse scan (and repairs the
+        index) when it is unset or stale, e.g. after messages were replaced.
+        """
+        msgs = self.messages
+        idx = self.last_user_idx
+        if idx is None or not (0 <= idx < len(msgs)) or msgs[idx].get("role") != "user":
+            idx = next((i for i in range(len(msgs) - 1, -1, -1) if msgs[i].get("role") == "user"), None)
+            self.last_user_idx = idx
+            if idx is None:
+                return ""
+        return (msgs[idx].get("content") or "").strip()
+
+    def log(self, text: str, *args: object) -> None:
+        """
+        Append a trace line. Extra args are %-formatted into `text` only when
+        tracing is enabled, so callers can pass reprs of large values for free.
+        """
+        if not DEFAULT_CONFIG.trace_enabled:
+            return
+        self.trace.append(text % args if args else text)
 
 
 # Alias used by LangGraph
@@ -1,27 +1,42 @@
 from __future__ import annotations
 
+from collections import deque
+from functools import lru_cache
+import os
+import select
 import shlex
 import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
+from typing import IO
 
 from ..state import ExecRequest, ExecResult
 from .fs_tools import ROOT_DIR
 
 # ---- Safety policy (tweak as needed) ----
-ALLOWED_BINARIES = {
+ALLOWED_BINARIES = frozenset({
     "python", "python3",
     "pytest",
     "ruff",
     "mypy",
     "git",
     "df"
-}
+})
 
 # Disallow shell metacharacters (no chaining / redirects).
 # IMPORTANT: we only block these when they appear as SEPARATE argv tokens after shlex.split(),
 # not as substrings inside quoted arguments (e.g. python -c "import os; print(...)").
-DISALLOWED_ARG_TOKENS = {"&&", "||", "|", ">", "<", "`"}
+DISALLOWED_ARG_TOKENS = frozenset({"&&", "||", "|", ";", ">", "<", "`"})
+
+# git: read-only-ish subcommands, plus `apply --check` without these flags.
+GIT_ALLOWED_SUBCOMMANDS = frozenset({"status", "diff", "ls-files", "apply"})
+GIT_APPLY_RESTRICTED_FLAGS = frozenset({"--reject", "--unsafe-paths"})
+
+
+_PY_NAMES = frozenset({"python", "python3"})
+_SYS_EXE = sys.executable
 
 
 def _special_case_git_diff_redirect(cmd: str) -> Path | None:
@@ -37,65 +52,89 @@ def _special_case_git_diff_redirect(cmd: str) -> Path | None:
     return None
 
 
-def _is_safe_command(cmd: str) -> tuple[bool, str]:
+def _check_command(cmd: str) -> tuple[list[str] | None, str]:
+    """
+    Apply the safety policy. Returns (argv, "") when allowed, so callers reuse the
+    tokens instead of splitting again, or (None, reason) when blocked.
+    """
     c = cmd.strip()
     if not c:
-        return False, "Blocked by safety filter: empty command."
+        return None, "Blocked by safety filter: empty command."
 
     try:
         parts = shlex.split(c)
     except Exception:
-        return False, "Blocked by safety filter: failed to parse command."
+        return None, "Blocked by safety filter: failed to parse command."
 
     if not parts:
-        return False, "Blocked by safety filter: empty command."
+        return None, "Blocked by safety filter: empty command."
 
     # Block shell operators only when they are separate argv tokens.
     # This prevents "python -c ... | cat" etc, while allowing semicolons inside python -c strings.
-    if any(p in DISALLOWED_ARG_TOKENS for p in parts):
-        return False, "Blocked by safety filter: shell metacharacters are not allowed."
+    if not DISALLOWED_ARG_TOKENS.isdisjoint(parts):
+        return None, "Blocked by safety filter: shell metacharacters are not allowed."
 
     exe = parts[0]
 
     if exe != "git" and exe not in ALLOWED_BINARIES:
         return (
-            False,
+            None,
             f"Blocked by safety filter: '{exe}' is not in ALLOWED_BINARIES.",
         )
 
     # Extra safety for git: allow only read-only-ish commands + apply --check
     if exe == "git":
         if len(parts) < 2:
-            return False, "Blocked by safety filter: git subcommand is required."
+            return None, "Blocked by safety filter: git subcommand is required."
         sub = parts[1]
-        allowed_sub = {"status", "diff", "ls-files", "apply"}
-        if sub not in allowed_sub:
-            return False, f"Blocked by safety filter: git {sub} is not allowed."
+        if sub not in GIT_ALLOWED_SUBCOMMANDS:
+            return None, f"Blocked by safety filter: git {sub} is not allowed."
         if sub == "apply":
             # Only allow dry-run validation; never apply changes here.
             if "--check" not in parts:
-                return False, "Blocked by safety filter: git apply requires --check."
+                return None, "Blocked by safety filter: git apply requires --check."
             # Disallow flags that can write reject files or bypass path safety.
-            if any(f in parts for f in ["--reject", "--unsafe-paths"]):
-                return False, "Blocked by safety filter: git apply flags are restricted."
-        return True, ""
+            if not GIT_APPLY_RESTRICTED_FLAGS.isdisjoint(parts):
+                return None, "Blocked by safety filter: git apply flags are restricted."
 
-    return True, ""
+    return parts, ""
 
 
+def _is_safe_command(cmd: str) -> tuple[bool, str]:
+    argv, error_message = _check_command(cmd)
+    return argv is not None, error_message
+
+
+_ROOT_RESOLVED = ROOT_DIR.resolve()
+
+
+@lru_cache(maxsize=64)
 def _resolve_workdir(workdir: str) -> Path:
+    # Only a handful of distinct workdirs ever show up, so each is resolved once.
     wd = (ROOT_DIR / workdir).resolve()
-    root = ROOT_DIR.resolve()
+    root = _ROOT_RESOLVED
     if root not in wd.parents and wd != root:
         raise ValueError(f"Unsafe workdir escapes repo: {workdir!r}")
     return wd
 
 
+_SHLEX_SPECIAL = ("'", '"', "\\")
+
+
 def _is_python_fallback(prev_cmd: str, next_cmd: str) -> bool:
     """
     Detect: python X -> python3 X
     Only exact argv match except for python/python3.
     """
+    # Almost no command pair looks like this; decide on the prefixes before tokenizing.
+    if not (prev_cmd.startswith("python") and next_cmd.startswith("python3")):
+        return False
+    if not any(ch in prev_cmd or ch in next_cmd for ch in _SHLEX_SPECIAL):
+        # No quotes or escapes: a whitespace split yields the same argv as shlex.
+        a = prev_cmd.split()
+        b = next_cmd.split()
+        return a[0] == "python" and b[0] == "python3" and a[1:] == b[1:]
+
     try:
         a = shlex.split(prev_cmd)
         b = shlex.split(next_cmd)
@@ -109,15 +148,101 @@ def _is_python_fallback(prev_cmd: str, next_cmd: str) -> bool:
     return a[1:] == b[1:]
 
 
-def _normalize_argv(argv: list[str]) -> list[str]:
+MAX_OUTPUT_BYTES = 1 << 20  # per stream; older output is dropped, the tail is kept
+
+
+class _TailBuffer:
+    """Keeps only the last `max_bytes` of a byte stream."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.chunks: deque[bytes] = deque()
+        self.size = 0
+        self.dropped = 0
+
+    def _add(self, chunk: bytes) -> None:
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        while self.size - len(self.chunks[0]) >= self.max_bytes:
+            old = self.chunks.popleft()
+            self.size -= len(old)
+            self.dropped += len(old)
+
+    def drain(self, pipe: IO[bytes], stop: threading.Event) -> None:
+        try:
+            if os.name == "posix":
+                # Poll so the reader can be told to stop while a grandchild still
+                # holds the write end open (EOF would never come).
+                fd = pipe.fileno()
+                while not stop.is_set():
+                    if not select.select([fd], [], [], _READER_POLL_S)[0]:
+                        continue
+                    chunk = os.read(fd, 1 << 16)
+                    if not chunk:
+                        break
+                    self._add(chunk)
+            else:
+                # No select() on Windows pipes; the reader is a daemon and is
+                # simply abandoned if it outlives the deadline.
+                for chunk in iter(lambda: pipe.read1(1 << 16), b""):
+                    self._add(chunk)
+        finally:
+            pipe.close()
+
+    def text(self) -> str:
+        data = b"".join(self.chunks)
+        if len(data) > self.max_bytes:
+            self.dropped += len(data) - self.max_bytes
+            data = data[-self.max_bytes:]
+        # Same newline handling as text=True (universal newlines).
+        out = data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+        return f"...[truncated {self.dropped} bytes]\n{out}" if self.dropped else out
+
+
+_READER_POLL_S = 0.1
+# Extra time the readers get to pick up the last output of a child that was just killed.
+_DRAIN_GRACE_S = 0.5
+
+
+def _run_bounded(argv: list[str], cwd: Path, timeout: float, max_bytes: int = MAX_OUTPUT_BYTES) -> tuple[int, str, str]:
     """
-    Make python invocations use the current venv interpreter reliably.
+    subprocess.run(capture_output=True) with a memory cap: two reader threads drain
+    stdout/stderr into tail buffers, so a runaway command can't buffer hundreds of
+    MB before it is killed. Raises subprocess.TimeoutExpired (with the output tails)
+    after killing the child, or when the pipes are still open at the deadline
+    (e.g. a grandchild inherited them); as with subprocess.run, the timeout covers
+    reading the output, not just the child's exit.
     """
-    if not argv:
-        return argv
-    if argv[0] in ("python", "python3"):
-        argv = [sys.executable] + argv[1:]
-    return argv
+    deadline = time.monotonic() + timeout
+    proc = subprocess.Popen(argv, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = _TailBuffer(max_bytes), _TailBuffer(max_bytes)
+    stop = threading.Event()
+    readers = [
+        threading.Thread(target=out.drain, args=(proc.stdout, stop), daemon=True),
+        threading.Thread(target=err.drain, args=(proc.stderr, stop), daemon=True),
+    ]
+    for t in readers:
+        t.start()
+    timed_out = False
+    try:
+        rc = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        rc = proc.wait()
+        timed_out = True
+
+    for t in readers:
+        t.join(max(deadline - time.monotonic(), _DRAIN_GRACE_S if timed_out else 0.0))
+    if any(t.is_alive() for t in readers):
+        # Stop waiting for EOF; the POSIX readers notice within one poll and close their pipe.
+        stop.set()
+        for t in readers:
+            t.join(_DRAIN_GRACE_S)
+        timed_out = True
+
+    if timed_out:
+        raise subprocess.TimeoutExpired(argv, timeout, output=out.text(), stderr=err.text())
+    return int(rc), out.text(), err.text()
 
 
 def run_exec_request(req: ExecRequest) -> list[ExecResult]:
@@ -171,8 +296,8 @@ def run_exec_request(req: ExecRequest) -> list[ExecResult]:
         if prev_cmd is not None and prev_rc == 0 and _is_python_fallback(prev_cmd, cmd):
             continue
 
-        is_safe, error_message = _is_safe_command(cmd)
-        if not is_safe:
+        argv, error_message = _check_command(cmd)
+        if argv is None:
             results.append(
                 ExecResult(
                     command=cmd,
@@ -185,20 +310,16 @@ def run_exec_request(req: ExecRequest) -> list[ExecResult]:
             continue
 
         try:
-            argv = _normalize_argv(shlex.split(cmd))
-
-            proc = subprocess.run(
-                argv,
-                cwd=str(wd),
-                capture_output=True,
-                text=True,
-                timeout=120,
-            )
+            # Make python invocations use the current venv interpreter reliably.
+            if argv[0] in _PY_NAMES:
+                argv[0] = _SYS_EXE
+
+            rc, stdout, stderr = _run_bounded(argv, wd, timeout=120)
             res = ExecResult(
                 command=cmd,
-                returncode=int(proc.returncode),
-                stdout=proc.stdout or "",
-                stderr=proc.stderr or "",
+                returncode=rc,
+                stdout=stdout,
+                stderr=stderr,
             )
         except subprocess.TimeoutExpired as e:
             res = ExecResult(
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+import os
 from pathlib import Path
 from typing import Iterable
 
@@ -9,6 +11,12 @@ from ..state import CodePatch
 # Root is the repo root: .../llamia_v3_2/
 ROOT_DIR = Path(__file__).resolve().parents[2]
 WORKSPACE_DIR = ROOT_DIR / "workspace"
+_WS_RESOLVED = WORKSPACE_DIR.resolve()
+_WS_PREFIX = os.path.join(str(_WS_RESOLVED), "")
+
+MAX_WRITE_WORKERS = 8
+WRITE_BUFFER_BYTES = 128 * 1024
+_NO_NEWLINE_TRANSLATION = os.linesep == "\n"
 
 
 def ensure_workspace() -> Path:
@@ -19,8 +27,6 @@ def ensure_workspace() -> Path:
     return WORKSPACE_DIR
 
 
-
-
 def _safe_workspace_path(rel_path: str) -> Path:
     """Resolve a user-provided relative path safely within WORKSPACE_DIR.
 
@@ -47,60 +53,84 @@ def _safe_workspace_path(rel_path: str) -> Path:
     if any(part == ".." for part in p.parts):
         raise ValueError(f"Directory traversal is not allowed: {rel_path}")
 
-    ws = WORKSPACE_DIR.resolve()
-    target = (WORKSPACE_DIR / p).resolve()
-
-    # Ensure target is inside workspace
-    if ws != target and ws not in target.parents:
+    # With '..' and absolute paths rejected, only a symlink inside the workspace
+    # can lead out of it. lstat just the components below workspace/ instead of
+    # resolve()-ing the whole absolute path on every call.
+    ws = _WS_RESOLVED
+    target = Path(os.path.normpath(os.path.join(_WS_PREFIX, rel)))
+    cur = ws
+    for part in target.relative_to(ws).parts:
+        cur = cur / part
+        if cur.is_symlink():
+            target = target.resolve()
+            break
+
+    # Ensure target is strictly inside workspace (the root itself is not a file)
+    if not str(target).startswith(_WS_PREFIX):
         raise ValueError(f"Unsafe workspace path: {rel_path}")
 
     return target
+
+
 def _normalize_path(file_path: str) -> Path:
     """
     Interpret file_path as relative to the workspace.
     We allow paths like "hello.py" or "subdir/script.py".
 
-    Security:
-    - Prevent path traversal (..), absolute paths, and writing outside workspace/.
-
-    If the model includes a leading 'workspace/' in the path, strip it.
+    Path checks are _safe_workspace_path's: no absolute paths, no '..', and the
+    result must stay inside workspace/. A leading 'workspace/' is stripped.
     """
-    ws = ensure_workspace().resolve()
-    cleaned = file_path.lstrip("/")
+    ensure_workspace()
+    return _safe_workspace_path(file_path)
 
-    if cleaned.startswith("workspace/"):
-        cleaned = cleaned[len("workspace/") :]
 
-    # Resolve the final path and ensure it stays within workspace
-    target = (ws / cleaned).resolve()
-    if ws in target.parents:
-        return target
-    raise ValueError(f"Refusing to write outside workspace: {file_path!r}")
-
-
-def apply_patch(patch: CodePatch) -> Path:
-    """
-    Apply a single patch to the workspace.
-    Returns the absolute Path of the file written.
-    """
-    target = _normalize_path(patch.file_path)
+def _write_patch(target: Path, patch: CodePatch) -> Path:
     target.parent.mkdir(parents=True, exist_ok=True)
 
     if patch.apply_mode == "append" and target.exists():
-        with target.open("a", encoding="utf-8") as f:
+        with target.open("a", encoding="utf-8", buffering=WRITE_BUFFER_BYTES) as f:
             f.write(patch.content)
+    elif _NO_NEWLINE_TRANSLATION:
+        # Text mode would write the same bytes here; encode once and hand them to
+        # FileIO without building a TextIOWrapper + BufferedWriter.
+        target.write_bytes(patch.content.encode("utf-8"))
     else:
-        with target.open("w", encoding="utf-8") as f:
-            f.write(patch.content)
+        target.write_text(patch.content, encoding="utf-8")
 
     return target
 
 
+def apply_patch(patch: CodePatch) -> Path:
+    """
+    Apply a single patch to the workspace.
+    Returns the absolute Path of the file written.
+    """
+    return _write_patch(_normalize_path(patch.file_path), patch)
+
+
 def apply_patches(patches: Iterable[CodePatch]) -> list[Path]:
     """
     Apply all patches and return the list of written files.
+
+    Different files are written concurrently; patches to the same file are
+    applied in their original order, so overwrite-then-append still works.
+    Every path is validated before anything is written.
     """
-    written: list[Path] = []
-    for patch in patches:
-        written.append(apply_patch(patch))
-    return written
+    patches = list(patches)
+    targets = [_normalize_path(p.file_path) for p in patches]
+
+    by_target: dict[Path, list[int]] = {}
+    for i, target in enumerate(targets):
+        by_target.setdefault(target, []).append(i)
+
+    if len(by_target) <= 1:
+        return [_write_patch(t, p) for t, p in zip(targets, patches)]
+
+    def _apply_group(indices: list[int]) -> None:
+        for i in indices:
+            _write_patch(targets[i], patches[i])
+
+    with ThreadPoolExecutor(max_workers=min(len(by_target), MAX_WRITE_WORKERS)) as pool:
+        # list() re-raises the first write error, as the serial loop did.
+        list(pool.map(_apply_group, by_target.values()))
+    return targets
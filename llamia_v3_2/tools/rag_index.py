@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, lru_cache
 from pathlib import Path
+from typing import Iterator
 
 import chromadb
 from llama_index.core import (
@@ -9,6 +13,9 @@ from llama_index.core import (
     StorageContext,
     Settings,
 )
+from llama_index.core.ingestion import DocstoreStrategy, IngestionPipeline
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.storage.docstore import SimpleDocumentStore
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.llms.ollama import Ollama
 from llama_index.embeddings.ollama import OllamaEmbedding
@@ -17,7 +24,9 @@ from ..config import DEFAULT_CONFIG
 from .fs_tools import ROOT_DIR
 
 CHROMA_PATH = ROOT_DIR / ".llamia_chroma"
+DOCSTORE_PATH = CHROMA_PATH / "docstore.json"  # doc id -> content hash of what is in Chroma
 COLLECTION_NAME = "llamia_repo"
+INGEST_BATCH_DOCS = 32
 
 EXCLUDE_DIRS = {
     ".git",
@@ -37,12 +46,15 @@ REQUIRED_EXTS = {
 }
 
 
+@cache
 def _configure_llamaindex_models() -> None:
+    # Settings is process-global; the models only need to be built once.
     base_url = DEFAULT_CONFIG.ollama_base_url()
 
     Settings.embed_model = OllamaEmbedding(
         model_name=DEFAULT_CONFIG.embed_model,
         base_url=base_url,
+        embed_batch_size=DEFAULT_CONFIG.embed_batch_size,
     )
 
     m = DEFAULT_CONFIG.model_for("research")
@@ -53,6 +65,7 @@ def _configure_llamaindex_models() -> None:
     )
 
 
+@cache
 def _client() -> chromadb.PersistentClient:
     CHROMA_PATH.mkdir(parents=True, exist_ok=True)
     return chromadb.PersistentClient(path=str(CHROMA_PATH))
@@ -69,6 +82,9 @@ def _reset_collection() -> None:
     except Exception:
         pass
     c.get_or_create_collection(COLLECTION_NAME)
+    # Cached engines hold the deleted collection.
+    _cached_index.cache_clear()
+    _cached_engine.cache_clear()
 
 
 def _collection_count() -> int:
@@ -89,49 +105,130 @@ def _reader_for_path(root: Path) -> SimpleDirectoryReader:
         recursive=True,
         required_exts=sorted(REQUIRED_EXTS),
         exclude=excludes,
+        filename_as_id=True,  # stable doc ids, so unchanged files match their stored hash
     )
 
 
+def _load_shard(files: list[Path]) -> list:
+    return SimpleDirectoryReader(input_files=[str(f) for f in files], filename_as_id=True).load_data()
+
+
+def _iter_repo_docs(root: Path) -> Iterator[list]:
+    """
+    Yield the repo's Documents one shard (INGEST_BATCH_DOCS files) at a time.
+
+    Shards are read by rag_read_workers threads, at most that many ahead of the
+    consumer, so file reads overlap with embedding while memory stays bounded.
+    """
+    files = list(_reader_for_path(root).input_files)
+    workers = max(1, DEFAULT_CONFIG.rag_read_workers)
+    if workers == 1 or len(files) <= INGEST_BATCH_DOCS:
+        for i in range(0, len(files), INGEST_BATCH_DOCS):
+            yield _load_shard(files[i : i + INGEST_BATCH_DOCS])
+        return
+
+    shards = (files[i : i + INGEST_BATCH_DOCS] for i in range(0, len(files), INGEST_BATCH_DOCS))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llamia-ingest-read") as pool:
+        pending: deque = deque()
+        for shard in shards:
+            pending.append(pool.submit(_load_shard, shard))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def ingest_repo(force: bool = False) -> int:
     """
-    Build (or rebuild) a repo-wide vector index in .llamia_chroma/.
+    Build (or refresh) a repo-wide vector index in .llamia_chroma/.
 
     - force=False: no-op if collection already has vectors
-    - force=True: wipe and rebuild
+    - force=True: re-embed only files whose content hash changed since the last
+      ingest and drop files that are gone; without a stored docstore, wipe and rebuild
+
+    Returns the number of documents embedded or removed.
     """
     _configure_llamaindex_models()
 
+    incremental = False
     if force:
-        _reset_collection()
+        incremental = DOCSTORE_PATH.exists() and _collection_count() > 0
+        if not incremental:
+            _reset_collection()
     else:
         if _collection_count() > 0:
             return 0
 
-    docs = _reader_for_path(ROOT_DIR).load_data()
-    if not docs:
-        return 0
-
     collection = _get_collection()
     vector_store = ChromaVectorStore(chroma_collection=collection)
+    docstore = SimpleDocumentStore.from_persist_path(str(DOCSTORE_PATH)) if incremental else SimpleDocumentStore()
+
+    # Split, then embed embed_batch_size chunks per request and write straight to Chroma.
+    # UPSERTS skips documents whose hash is unchanged and replaces the vectors of changed ones.
+    pipeline = IngestionPipeline(
+        transformations=[
+            SentenceSplitter(
+                chunk_size=DEFAULT_CONFIG.rag_chunk_size,
+                chunk_overlap=DEFAULT_CONFIG.rag_chunk_overlap,
+            ),
+            Settings.embed_model,
+        ],
+        vector_store=vector_store,
+        docstore=docstore,
+        docstore_strategy=DocstoreStrategy.UPSERTS,
+    )
+    workers = DEFAULT_CONFIG.rag_ingest_workers
+    num_workers = workers if workers > 1 else None
+
+    # Documents still in the docstore after the walk no longer exist in the repo.
+    stale = set(docstore.get_all_document_hashes().values())
+
+    # Stream files through the pipeline INGEST_BATCH_DOCS documents at a time, so
+    # memory stays bounded by the batch instead of the whole repo.
+    total = 0
+    batch: list = []
+
+    def _flush() -> int:
+        stale.difference_update(d.doc_id for d in batch)
+        nodes = pipeline.run(documents=batch, num_workers=num_workers)
+        return len({n.ref_doc_id for n in nodes})
+
+    for shard_docs in _iter_repo_docs(ROOT_DIR):
+        batch.extend(shard_docs)
+        if len(batch) >= INGEST_BATCH_DOCS:
+            total += _flush()
+            batch = []
+    if batch:
+        total += _flush()
+
+    # Deletions are handled here rather than with UPSERTS_AND_DELETE, which would
+    # treat every document outside the current batch as deleted.
+    for doc_id in stale:
+        vector_store.delete(doc_id)
+        docstore.delete_document(doc_id, raise_error=False)
+    total += len(stale)
+
+    docstore.persist(persist_path=str(DOCSTORE_PATH))
+    return total
+
+
+@lru_cache(maxsize=1)
+def _cached_index() -> VectorStoreIndex:
+    _configure_llamaindex_models()
+    vector_store = ChromaVectorStore(chroma_collection=_get_collection())
     storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    return VectorStoreIndex.from_vector_store(
+        vector_store=vector_store,
+        storage_context=storage_context,
+    )
 
-    VectorStoreIndex.from_documents(docs, storage_context=storage_context)
-    return len(docs)
 
+@lru_cache(maxsize=8)
+def _cached_engine(k: int):
+    return _cached_index().as_query_engine(similarity_top_k=k)
 
-def query_repo(query: str, top_k: int | None = None) -> str:
-    _configure_llamaindex_models()
 
+def query_repo(query: str, top_k: int | None = None) -> str:
     k = int(top_k if top_k is not None else DEFAULT_CONFIG.rag_top_k)
-
-    collection = _get_collection()
-    vector_store = ChromaVectorStore(chroma_collection=collection)
-    storage_context = StorageContext.from_defaults(vector_store=vector_store)
-
-    index = VectorStoreIndex.from_vector_store(
-        vector_store=vector_store,
-        storage_context=storage_context,
-    )
-    engine = index.as_query_engine(similarity_top_k=k)
-    resp = engine.query(query)
+    resp = _cached_engine(k).query(query)
     return str(resp)
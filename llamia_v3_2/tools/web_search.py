@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import atexit
 from dataclasses import dataclass
 from typing import Any
 
 import httpx
 
+try:  # optional: faster C JSON parser
+    import orjson
+except Exception:  # pragma: no cover - orjson is not a hard dependency
+    orjson = None
+
 
 @dataclass
 class WebResult:
@@ -14,28 +20,18 @@ class WebResult:
     engine: str | None = None
 
 
-def searxng_search(
-    *,
-    base_url: str,
-    query: str,
-    top_k: int = 5,
-    timeout_s: int = 20,
-) -> list[WebResult]:
-    """
-    Call SearXNG JSON API:
-      GET {base_url}/search?q=...&format=json
+# One pooled keep-alive client for all SearXNG queries (no TCP/TLS setup per call);
+# the timeout is passed per request. HTTP/2 is not enabled: it needs the optional
+# 'h2' package, which is not a dependency.
+_CLIENT = httpx.Client(
+    follow_redirects=True,
+    limits=httpx.Limits(max_keepalive_connections=16),
+    transport=httpx.HTTPTransport(retries=1),
+)
+atexit.register(_CLIENT.close)
 
-    Returns a small list of WebResult.
-    """
-    base = base_url.rstrip("/")
-    url = f"{base}/search"
-    params = {"q": query, "format": "json"}
-
-    with httpx.Client(timeout=timeout_s, follow_redirects=True) as client:
-        resp = client.get(url, params=params)
-        resp.raise_for_status()
-        data: Any = resp.json()
 
+def _parse_results(data: Any, top_k: int) -> list[WebResult]:
     raw_results = data.get("results") or []
     out: list[WebResult] = []
 
@@ -53,3 +49,25 @@ def searxng_search(
             break
 
     return out
+
+
+def searxng_search(
+    *,
+    base_url: str,
+    query: str,
+    top_k: int = 5,
+    timeout_s: int = 20,
+) -> list[WebResult]:
+    """
+    Call SearXNG JSON API:
+      GET {base_url}/search?q=...&format=json
+
+    Returns a small list of WebResult.
+    """
+    url = base_url.rstrip("/") + "/search"
+    resp = _CLIENT.get(url, params={"q": query, "format": "json"}, timeout=timeout_s)
+    resp.raise_for_status()
+    if orjson is not None:
+        # Parse the raw UTF-8 bytes directly; skips httpx's charset detection + str decode.
+        return _parse_results(orjson.loads(resp.content), top_k)
+    return _parse_results(resp.json(), top_k)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test to verify patch-context path extraction
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add the project root to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+def test_extract_paths_from_goal():
+    """Test that file paths mentioned in the goal are matched against tracked files"""
+    from llamia_v3_2.nodes.coder_patch_context import extract_paths_from_goal
+    hits = extract_paths_from_goal("fix nodes/critic.py please", {"nodes/critic.py"})
+    assert hits == ["nodes/critic.py"], f"Expected ['nodes/critic.py'] but got {hits}"
+
+    hits = extract_paths_from_goal("edit a.py, then a.py and missing.py", {"a.py"})
+    assert hits == ["a.py"], f"Expected deduped tracked hits but got {hits}"
+
+    hits = extract_paths_from_goal(r"see nodes\critic.py", {"nodes/critic.py"})
+    assert hits == ["nodes/critic.py"], f"Expected backslashes normalized but got {hits}"
+    print("✓ Patch context path extraction test passed")
+
+def test_mmap_window_matches_text_window():
+    """Test that the mmap reader returns the same window as the text reader"""
+    from llamia_v3_2.nodes.coder_patch_context import _compile_anchors, _window_from_mmap, _window_from_text
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp) / "big.py"
+        p.write_text("".join(f"line {i}\n" for i in range(50)) + "def target():\n" + "    pass\n" * 10)
+        for anchors in (["def target"], ["no such anchor"], []):
+            regs = _compile_anchors(anchors)
+            for before in (0, 3):
+                for after in (0, 1, 5, 1000):
+                    window = {"window_before": before, "window_after": after, "fallback_max_lines": 20}
+                    got = _window_from_mmap(p, regs, **window)
+                    want = _window_from_text(p, regs, **window)
+                    assert got == want, f"anchors={anchors} before={before} after={after}: {got} != {want}"
+    print("✓ Patch context mmap window test passed")
+
+if __name__ == "__main__":
+    test_extract_paths_from_goal()
+    test_mmap_window_matches_text_window()
+    sys.exit(0)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test to verify single-pass patch parsing for the task contract
+"""
+
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+PATCH = (
+    "diff --git a/main.py b/main.py\n"
+    "index 111..222 100644\n"
+    "--- a/main.py\n"
+    "+++ b/main.py\n"
+    "@@ -1 +1 @@\n"
+    "-print('a')\n"
+    "+print('b')\n"
+    "diff --git a/new.txt b/new.txt\n"
+    "+   \n"
+)
+
+def test_parse_patch():
+    """Test that parse_patch answers touched/substantive/tracked in one pass"""
+    from llamia_v3_2.repl.contract import parse_patch, patch_touched_files
+    info = parse_patch(PATCH, {"main.py"})
+    assert info.touched_files == ["main.py", "new.txt"], f"Unexpected touched files: {info.touched_files}"
+    assert info.has_substantive, "Patch has real +/- changes"
+    assert info.touches_tracked, "main.py is tracked"
+
+    assert not parse_patch(PATCH, {"other.py"}).touches_tracked
+    assert not parse_patch("diff --git a/x b/x\n+   \n-\n").has_substantive, "Whitespace-only is not substantive"
+    assert patch_touched_files(PATCH) == info.touched_files, "Wrapper should match parse_patch"
+    print("✓ Patch parse test passed")
+
+def test_required_paths_and_patch_prompt():
+    """Test workspace path extraction (incl. hyphens) and patch prompt detection"""
+    from llamia_v3_2.repl.contract import extract_required_workspace_paths, prompt_requests_patch
+    got = extract_required_workspace_paths("write workspace/my-notes.md, then workspace/fix.patch. Again workspace/my-notes.md")
+    assert got == ["workspace/my-notes.md", "workspace/fix.patch"], f"Unexpected paths: {got}"
+    assert prompt_requests_patch("Produce a Unified Diff")
+    assert prompt_requests_patch("save the .patch after you create workspace/out")
+    assert not prompt_requests_patch("create workspace/notes.md")
+    print("✓ Contract prompt parsing test passed")
+
+if __name__ == "__main__":
+    test_parse_patch()
+    test_required_paths_and_patch_prompt()
+    sys.exit(0)
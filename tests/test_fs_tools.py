@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test to verify the workspace path guard used for patch writes
+"""
+
+import sys
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add the project root to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import llamia_v3_2.tools.fs_tools as fs_tools
+
+
+@contextmanager
+def _temp_workspace():
+    """Point the path guard at a throwaway workspace directory."""
+    saved = fs_tools._WS_RESOLVED, fs_tools._WS_PREFIX
+    with tempfile.TemporaryDirectory() as tmp:
+        ws = Path(tmp).resolve() / "workspace"
+        ws.mkdir()
+        fs_tools._WS_RESOLVED = ws
+        fs_tools._WS_PREFIX = os.path.join(str(ws), "")
+        try:
+            yield ws
+        finally:
+            fs_tools._WS_RESOLVED, fs_tools._WS_PREFIX = saved
+
+
+def _rejected(rel):
+    try:
+        fs_tools._safe_workspace_path(rel)
+    except ValueError:
+        return True
+    return False
+
+
+def test_accepts_workspace_relative_paths():
+    """Test that ordinary relative paths land inside the workspace"""
+    with _temp_workspace() as ws:
+        assert fs_tools._safe_workspace_path("hello.py") == ws / "hello.py"
+        assert fs_tools._safe_workspace_path("workspace/sub/x.py") == ws / "sub" / "x.py"
+        assert fs_tools._safe_workspace_path("./a//b.py") == ws / "a" / "b.py"
+    print("✓ Workspace-relative path test passed")
+
+
+def test_rejects_escapes():
+    """Test that the root, '..', absolute paths and symlink escapes are refused"""
+    with _temp_workspace() as ws:
+        for rel in ("", "  ", ".", "workspace/", "./", "../x", "sub/../../x", "/etc/passwd"):
+            assert _rejected(rel), f"{rel!r} should be rejected"
+
+        outside = ws.parent / "outside"
+        outside.mkdir()
+        (ws / "out").symlink_to(outside, target_is_directory=True)
+        assert _rejected("out/x.py"), "Symlink pointing outside the workspace should be rejected"
+        (ws / "self").symlink_to(ws, target_is_directory=True)
+        assert _rejected("self"), "Symlink to the workspace root should be rejected"
+
+        (ws / "real").mkdir()
+        (ws / "inner").symlink_to(ws / "real", target_is_directory=True)
+        assert fs_tools._safe_workspace_path("inner/y.py") == ws / "real" / "y.py"
+    print("✓ Path escape test passed")
+
+
+if __name__ == "__main__":
+    test_accepts_workspace_relative_paths()
+    test_rejects_escapes()
+    sys.exit(0)
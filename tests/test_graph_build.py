@@ -21,6 +21,123 @@ def test_graph_build():
         print(f"✗ Graph building test failed: {e}")
         return False
 
+def _build_with_local_chat(**kwargs):
+    """Build the graph with the LLM-backed chat node swapped for a local one."""
+    import llamia_v3_2.graph as graph_mod
+
+    def fake_chat(state):
+        state.add_message("assistant", "hi there", node="chat")
+        return state
+
+    orig = graph_mod.chat_node
+    graph_mod.chat_node = fake_chat
+    try:
+        return graph_mod.build_llamia_graph(**kwargs)
+    finally:
+        graph_mod.chat_node = orig
+
+def test_graph_invoke_with_node_cache():
+    """Test that a chat turn runs end to end with the node cache enabled"""
+    from llamia_v3_2.graph import CachePolicy
+    from llamia_v3_2.state import CancelToken, InvocationCancelled, LlamiaState
+    from llamia_v3_2.repl.app import _invoke_graph
+    from llamia_v3_2.repl.config import ReplConfig
+    from llamia_v3_2.repl.state_utils import coerce_to_state
+
+    app = _build_with_local_chat(node_cache=True, cache_ttl=60)
+    if CachePolicy is None:
+        print("- Node cache test skipped (langgraph without CachePolicy)")
+        return
+
+    state = LlamiaState()
+    state.add_message("user", "hello", node="repl")
+    # Same call path as run_repl, including the per-invoke CancelToken.
+    out = coerce_to_state(_invoke_graph(app, state, ReplConfig()))
+    assert out.intent_kind == "chat", f"Unexpected intent: {out.intent_kind}"
+    assert out.messages[-1]["content"] == "hi there", f"Unexpected reply: {out.messages[-1]}"
+
+    cancelled = CancelToken()
+    cancelled.cancel()
+    try:
+        app.invoke(state, config={"configurable": {"cancel_token": cancelled}})
+    except InvocationCancelled:
+        pass
+    else:
+        raise AssertionError("A cancelled token should stop the run at the first node")
+    print("✓ Graph invoke with node cache test passed")
+
+def test_node_cache_hit():
+    """Test that re-invoking an identical state is served from the node cache"""
+    import llamia_v3_2.graph as graph_mod
+    from llamia_v3_2.state import LlamiaState
+
+    calls = []
+    orig = graph_mod.intent_classifier_node
+
+    def counting_classifier(state):
+        calls.append(state.turn_id)
+        return orig(state)
+
+    graph_mod.intent_classifier_node = counting_classifier
+    try:
+        app = _build_with_local_chat(node_cache=True, cache_ttl=60)
+    finally:
+        graph_mod.intent_classifier_node = orig
+    if graph_mod.CachePolicy is None:
+        print("- Node cache hit test skipped (langgraph without CachePolicy)")
+        return
+
+    def fresh(text):
+        # Nodes append to the input's lists in place, so build a new state per invoke.
+        state = LlamiaState()
+        state.add_message("user", text, node="repl")
+        return state
+
+    first = app.invoke(fresh("hello"))
+    second = app.invoke(fresh("hello"))
+    assert len(calls) == 1, f"Second invoke should hit the cache, classifier ran {len(calls)} times"
+    assert second["intent_kind"] == first["intent_kind"] == "chat"
+
+    app.invoke(fresh("hello again"))
+    assert len(calls) == 2, "A different input state must miss the cache"
+    print("✓ Node cache hit test passed")
+
+def test_invoke_detaches_repl_state():
+    """Test that the graph run never appends to the REPL's own lists"""
+    from llamia_v3_2.state import LlamiaState
+    from llamia_v3_2.repl.app import _invoke_graph
+    from llamia_v3_2.repl.config import ReplConfig
+
+    app = _build_with_local_chat()
+    state = LlamiaState()
+    state.add_message("user", "hello", node="repl")
+    out = _invoke_graph(app, state, ReplConfig())
+    assert out["messages"] is not state.messages
+    assert len(state.messages) == 1, f"REPL state was mutated: {state.messages}"
+    assert out["messages"][-1]["content"] == "hi there"
+    print("✓ Detached invoke test passed")
+
+def test_coerce_graph_output_fast_path():
+    """Test that real graph output (dict trace events included) takes the fast path"""
+    from llamia_v3_2.state import LlamiaState
+    from llamia_v3_2.repl.state_utils import _is_well_typed, coerce_to_state
+
+    app = _build_with_local_chat()
+    state = LlamiaState()
+    state.add_message("user", "hello", node="repl")
+    out = app.invoke(state)
+    assert any(isinstance(t, dict) for t in out.get("trace", [])), "Expected dict trace events in graph output"
+    assert _is_well_typed(out), "Graph output should qualify for the fast path"
+    coerced = coerce_to_state(out)
+    # The slow path rebuilds plan/patch lists; the fast path hands them through.
+    assert coerced.plan is out["plan"], "coerce_to_state should have taken the fast path"
+    assert coerced.trace is out["trace"]
+    print("✓ Coerce fast path test passed")
+
 if __name__ == "__main__":
     success = test_graph_build()
+    test_graph_invoke_with_node_cache()
+    test_node_cache_hit()
+    test_invoke_detaches_repl_state()
+    test_coerce_graph_output_fast_path()
     sys.exit(0 if success else 1)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Test to verify the shared intent heuristics
+"""
+
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+def test_classify():
+    """Test that explicit prefixes and the task heuristic are classified correctly"""
+    from llamia_v3_2.nodes._intent_heuristics import classify
+    cases = {
+        "web: langgraph docs": ("research_web", "explicit_web", "langgraph docs"),
+        "you> Search: searxng api": ("research_web", "explicit_web", "searxng api"),
+        "reindex: critic": ("research", "explicit_research", "reindex: critic"),
+        "task: build a cli": ("task", "explicit_task", "build a cli"),
+        "write a script that prints hi": ("task", "heuristic_task", "write a script that prints hi"),
+        "hello": ("chat", "default_chat", None),
+        "taskmaster": ("chat", "default_chat", None),
+    }
+    for text, expected in cases.items():
+        got = classify(text)
+        assert got == expected, f"{text!r}: expected {expected} but got {got}"
+    print("✓ Intent classify test passed")
+
+if __name__ == "__main__":
+    test_classify()
+    sys.exit(0)
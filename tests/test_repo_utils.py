@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test to verify git ls-files listing in repo_utils
+"""
+
+import sys
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+# Add the project root to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+def test_ls_files_raw_names():
+    """Test that limited and unlimited listings return the same raw (unquoted, unstripped) names"""
+    from llamia_v3_2.repl.paths import RepoPaths
+    from llamia_v3_2.repl.repo_utils import _LS_FILES_CACHE, git_ls_files
+
+    names = sorted(["déjà.py", " spaced.py ", "plain.py"])
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for name in names:
+            (root / name).write_text("x\n")
+        subprocess.run(["git", "init", "-q"], cwd=tmp, check=True)
+        subprocess.run(["git", "add", "--", *names], cwd=tmp, check=True)
+        paths = RepoPaths(repo_root=root, workspace_dir=root / "workspace")
+
+        _LS_FILES_CACHE.pop(root, None)
+        limited = git_ls_files(paths, limit=10)
+        full = git_ls_files(paths)
+        assert sorted(full) == names, f"Unexpected names: {full}"
+        assert limited == full, f"limit should not change the names: {limited} vs {full}"
+        assert git_ls_files(paths, limit=10) == full, "Cached listing should match"
+        _LS_FILES_CACHE.pop(root, None)
+    print("✓ ls-files raw names test passed")
+
+if __name__ == "__main__":
+    test_ls_files_raw_names()
+    sys.exit(0)
@@ -55,11 +55,30 @@ def test_state_logging():
         print(f"✗ State logging test failed: {e}")
         return False
 
+def test_state_last_user_idx():
+    """Test that add_message tracks the latest user message index"""
+    from llamia_v3_2.state import LlamiaState
+    state = LlamiaState()
+    assert state.last_user_idx is None, "No user message yet"
+    state.add_message("user", "first", "repl")
+    state.add_message("system", "note", "main")
+    assert state.last_user_idx == 0, "Index should point at the user message"
+    state.add_message("user", "second", "repl")
+    assert state.last_user_idx == 2, "Index should follow the newest user message"
+    assert state.latest_user_text() == "second"
+
+    # Stale index (messages replaced wholesale) falls back to a scan
+    state.messages = [{"role": "user", "content": " only ", "node": "repl"}]
+    assert state.latest_user_text() == "only", "Stale index should fall back to a scan"
+    assert state.last_user_idx == 0, "Fallback should repair the index"
+    print("✓ State last_user_idx test passed")
+
 if __name__ == "__main__":
     results = [
         test_state_initialization(),
         test_state_message_adding(),
         test_state_logging()
     ]
+    test_state_last_user_idx()
     success = all(results)
     sys.exit(0 if success else 1)